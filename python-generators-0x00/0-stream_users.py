@@ -1,35 +1,64 @@
-from seed import connect_to_prodev
+from seed import DatabaseError, close_cursor, get_backend, pooled_connection
+from rows import row_converter
+import scans
 
-import mysql.connector
-from contextlib import closing
 
-def stream_users():
+def stream_users(row_format="dict", long_scan=False):
     """
     Creates a generator that fetches rows from the user_data table one by one.
 
     This function uses a server-side cursor to fetch rows iteratively, 
-    minimizing the memory footprint for large datasets.
+    minimizing the memory footprint for large datasets. The connection is
+    borrowed from the shared pool in seed.py and handed back when the
+    generator finishes or is closed.
+
+    Args:
+        row_format (str): "dict" (default), "tuple", "namedtuple" or
+            "record"; the compact formats avoid a dict per row (see rows.py).
+        long_scan (bool or dict): Use scans.robust_stream_users instead,
+            which yields the rows in user_id order, stops pinning the
+            connection once the scan runs long or the consumer stalls, and
+            resumes after a dropped connection. A dict gives its options,
+            e.g. {"stall_seconds": 1}. A stalled consumer keeps the
+            connection until the registry's watchdog cancels it, up to
+            stall_seconds plus scans.WATCHDOG_INTERVAL; with
+            {"watchdog": False}, until it asks for the next row.
+            {"max_stream_seconds": 0} never pins a connection at all.
     """
-    connection = connect_to_prodev()
-    if not connection:
+    if long_scan:
+        options = long_scan if isinstance(long_scan, dict) else {}
+        yield from scans.robust_stream_users(row_format, **options)
         return
 
-    # Use buffered=False to enable server-side cursors (unbuffered iteration)
-    # This is essential for large datasets as it prevents fetching all results 
-    # into client memory at once.
-    with closing(connection):
-        # Use buffered=False for server-side cursors (unbuffered iteration)
-        with closing(connection.cursor(dictionary=True, buffered=False)) as cursor:
-            query = "SELECT user_id, name, email, age FROM user_data"
+    convert = None if row_format == "dict" else row_converter(row_format)
 
-            try:
-                cursor.execute(query)
-                
+    with pooled_connection() as connection:
+        if not connection:
+            return
+
+        # A server-side cursor (unbuffered on MySQL) iterates rows as they arrive.
+        # This is essential for large datasets as it prevents fetching all results 
+        # into client memory at once.
+        cursor = get_backend().server_cursor(connection, dictionary=convert is None)
+        query = "SELECT user_id, name, email, age FROM user_data"
+
+        try:
+            cursor.execute(query)
+
+            if convert is None:
                 for row in cursor:
                     yield row
-                    
-            except mysql.connector.Error as err:
-                print(f"Error executing query: {err}")
+            else:
+                for row in cursor:
+                    yield convert(row)
+                
+        except DatabaseError as err:
+            print(f"Error executing query: {err}")
+
+        finally:
+            # If the consumer stopped early (e.g. islice) the rest of the
+            # result set is unread and the pool drops this connection.
+            close_cursor(cursor)
     # cursor = connection.cursor(dictionary=True, buffered=False)
     
     # query = "SELECT user_id, name, email, age FROM user_data"
@@ -41,7 +70,7 @@ def stream_users():
     #     for row in cursor:
     #         yield row
             
-    # except mysql.connector.Error as err:
+    # except DatabaseError as err:
     #     print(f"Error executing query: {err}")
         
     # finally:
@@ -1,68 +1,151 @@
-from seed import connect_to_prodev
-import json
-import mysql.connector
+from seed import DatabaseError, close_cursor, get_backend, pooled_connection
+from predicates import apply_residual, build_select, compile_projection
+from rows import batch_converter, greater_than
+from prefetch import prefetched
+from adaptive import BatchSizer, sample_rows
+from encoders import get_encoder
+import time
 
 
-def stream_users_in_batches(batch_size):
+def stream_users_in_batches(batch_size, filters=None, columns=None, prefetch=0,
+                            row_format="dict", adaptive=None):
     """
     Generator that fetches rows from the user_data table in batches.
 
+    Filters and the column subset are compiled into the SQL (see
+    predicates.py), so rows the consumer would drop and columns it does not
+    need never leave the server. Callable filters, which SQL cannot express,
+    run on each fetched batch instead; they only see the projected columns.
+
+    With prefetch=N a background thread keeps up to N batches fetched ahead
+    while the consumer processes the current one (see prefetch.py), so a
+    slow consumer no longer waits for every fetchmany in turn.
+
+    With adaptive=True the fetchmany size starts at batch_size and is then
+    tuned from the measured fetch latency and row width (see adaptive.py),
+    so batch sizes vary. Pass an adaptive.BatchSizer for other bounds or
+    targets, or to inspect the sizes it chose afterwards.
+
     Args:
         batch_size (int): The number of rows to fetch per batch.
+        filters (list): Filter specs, e.g. [("age", ">", 25)].
+        columns (iterable): Columns to fetch; all of them when None.
+        prefetch (int): Number of batches to read ahead; 0 disables it.
+        row_format (str): "dict", "tuple", "namedtuple", "record" or
+            "columns" (a rows.ColumnBatch per batch); see rows.py.
+        adaptive (bool or BatchSizer): Tune the batch size on the fly.
     
     Yields:
-        list: A list of user dictionaries (one batch).
+        list: A list of user dictionaries (one batch), or the batch in the
+        chosen row_format. Batches can be shorter than batch_size when
+        callable filters drop rows.
     """
-    connection = connect_to_prodev()
-    if not connection:
-        return
-
-    # Use dictionary=True for dict output, buffered=False for better streaming 
-    # (though fetchmany is typically buffered, this is good practice).
-    cursor = connection.cursor(dictionary=True, buffered=False) 
-    query = "SELECT user_id, name, email, age FROM user_data"
-
-    try:
-        cursor.execute(query)
-        
-        # Loop 1: Continues until fetchmany returns an empty list
-        while True:
-            # Fetch the next batch of data (up to batch_size rows)
-            batch = cursor.fetchmany(batch_size)
+    sizer = adaptive
+    if adaptive is True:
+        sizer = BatchSizer(initial=batch_size)
+    batches = _fetch_batches(batch_size, filters, columns, row_format, sizer or None)
+    if prefetch:
+        batches = prefetched(batches, prefetch)
+    # Closing this generator early closes `batches`, which stops the
+    # prefetch thread and returns the connection to the pool.
+    yield from batches
+
+
+def _fetch_batches(batch_size, filters, columns, row_format="dict", sizer=None):
+    """The fetchmany loop behind stream_users_in_batches."""
+    query, params, residual = build_select(columns, filters)
+    # Non-dict formats are built from plain tuple rows.
+    names = None if row_format == "dict" else compile_projection(columns)
+    convert = None if row_format == "dict" else batch_converter(row_format, names)
+
+    with pooled_connection() as connection:
+        if not connection:
+            return
+
+        # Use dictionary=True for dict output, a server-side cursor for streaming
+        # (though fetchmany is typically buffered, this is good practice).
+        cursor = get_backend().server_cursor(connection, dictionary=names is None)
+
+        try:
+            cursor.execute(query, params)
             
-            # If the batch is empty, we've reached the end of the data
-            if not batch:
-                break
+            # Loop 1: Continues until fetchmany returns an empty list
+            while True:
+                # Fetch the next batch of data (up to batch_size rows, or
+                # the size the adaptive sizer currently picks)
+                started = time.perf_counter()
+                batch = cursor.fetchmany(sizer.size if sizer else batch_size)
+                
+                # If the batch is empty, we've reached the end of the data
+                if not batch:
+                    break
+
+                if sizer:
+                    sizer.observe(len(batch), time.perf_counter() - started,
+                                  sample_rows(batch))
+
+                # Client-side filters SQL could not express, if any
+                batch = apply_residual(batch, residual, names)
+                if not batch:
+                    continue
+                    
+                # Yield the entire list/batch of rows
+                yield convert(batch) if convert else batch
                 
-            # Yield the entire list/batch of rows
-            yield batch
+        except DatabaseError as err:
+            print(f"Error executing query: {err}")
             
-    except mysql.connector.Error as err:
-        print(f"Error executing query: {err}")
-        
-    finally:
-        cursor.close()
-        connection.close()
+        finally:
+            close_cursor(cursor)
 
 
-def batch_processing(batch_size):
+def batch_processing(batch_size, columns=None, prefetch=0):
     """
     Generator that processes batches to filter users over the age of 25.
 
     Args:
         batch_size (int): The batch size to use for streaming data.
+        columns (iterable): Columns to fetch; all of them when None.
+        prefetch (int): Batches to read ahead on a background thread.
 
     Yields:
         dict: A dictionary representing a user who is older than 25.
     """
+    # Filtering logic: the 'age' > 25 check is pushed down into the SQL
+    # WHERE clause, so younger users are never sent by the server.
+    over_25 = [("age", ">", 25)]
+
     # Loop 2: Iterates over the batches yielded by the streaming generator
-    for batch in stream_users_in_batches(batch_size):
+    for batch in stream_users_in_batches(batch_size, over_25, columns, prefetch):
         # Loop 3: Iterates over the individual rows within the current batch
         for user in batch:
-            # Filtering logic: check if 'age' is greater than 25
-            if user.get('age', 0) > 25:
-                # Yield the filtered user data
-                yield user
+            # Yield the filtered user data
+            yield user
+
+
+def batch_processing_columnar(batch_size, min_age=25, prefetch=0):
+    """
+    Generator that filters columnar batches with a vectorised age mask.
+
+    Batches are fetched as rows.ColumnBatch (typed column buffers) and the
+    age check runs as one comparison over the whole age column instead of
+    a Python loop over rows. batch_processing pushes the same filter into
+    SQL; this variant is for consumers that want columns for vectorised
+    work downstream anyway.
+
+    Args:
+        batch_size (int): The batch size to use for streaming data.
+        min_age (int): Keep users strictly older than this.
+        prefetch (int): Batches to read ahead on a background thread.
+
+    Yields:
+        rows.ColumnBatch: The users of one batch older than min_age.
+    """
+    for batch in stream_users_in_batches(batch_size, prefetch=prefetch,
+                                         row_format="columns"):
+        selected = batch.filter(greater_than(batch, "age", min_age))
+        if len(selected):
+            yield selected
 
 
 # --- Execution for main script ---
@@ -74,9 +157,11 @@ def batch_processing(batch_size):
 def process_and_print(batch_size):
     """Consumes the generator and prints the results."""
     # This acts as the consuming code in 2-main.py
+    # The compiled encoder prints exactly what json.dumps(user) would.
+    encode = get_encoder("compiled").row
     for user in batch_processing(batch_size):
         # Print the user dict to stdout, matching the expected output format
-        print(json.dumps(user)) 
+        print(encode(user))
 
 if __name__ == '__main__':
     # Simulating the behavior of 2-main.py
@@ -1,5 +1,14 @@
-import mysql.connector
-from seed import connect_to_prodev
+import base64
+import json
+
+from seed import DatabaseError, get_backend, pooled_connection
+
+# Columns a keyset page may be ordered on. The ORDER BY column is spliced
+# into the SQL text, so it must come from this list and never from user input.
+# Every column but user_id needs its (column, user_id) index from
+# seed.add_keyset_indexes, or each page sorts the whole table.
+KEYSET_COLUMNS = ("user_id", "name", "email", "age")
+
 
 def paginate_users(page_size, offset):
     """
@@ -12,52 +21,229 @@ def paginate_users(page_size, offset):
     Returns:
         list: A list of user dictionaries.
     """
-    connection = connect_to_prodev()
-    if not connection:
-        return []
-        
-    cursor = connection.cursor(dictionary=True)
-    
     # SQL query using LIMIT (page_size) and OFFSET (offset) for pagination
     query = f"SELECT * FROM user_data LIMIT {page_size} OFFSET {offset}"
-    
+
+    with pooled_connection() as connection:
+        if not connection:
+            return []
+
+        cursor = connection.cursor(dictionary=True)
+        try:
+            cursor.execute(query)
+            rows = cursor.fetchall()
+            return rows
+        except DatabaseError as err:
+            print(f"Database query error: {err}")
+            return []
+        finally:
+            cursor.close()
+
+
+def encode_resume_token(order_by, last_row):
+    """
+    Builds an opaque resume token from the last row of a page.
+
+    Args:
+        order_by (str): The column the pages are ordered on.
+        last_row (dict): The last user dictionary that was yielded.
+
+    Returns:
+        str: A URL-safe token that can be handed back to lazy_pagination.
+    """
+    key = [last_row[order_by], last_row["user_id"]]
+    payload = json.dumps({"c": order_by, "k": key}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+
+
+def decode_resume_token(token, order_by):
+    """
+    Unpacks a resume token produced by encode_resume_token.
+
+    Args:
+        token (str): The opaque token.
+        order_by (str): The column the caller is paginating on.
+
+    Returns:
+        tuple: The (order_by value, user_id) pair to resume after.
+
+    Raises:
+        ValueError: If the token is malformed or was issued for another column.
+    """
     try:
-        cursor.execute(query)
-        rows = cursor.fetchall()
-        return rows
-    except mysql.connector.Error as err:
-        print(f"Database query error: {err}")
-        return []
-    finally:
-        cursor.close()
-        connection.close()
+        payload = json.loads(base64.urlsafe_b64decode(token.encode("ascii")))
+        column, (value, user_id) = payload["c"], payload["k"]
+    except (ValueError, TypeError, KeyError) as err:
+        raise ValueError(f"Invalid resume token: {err}") from err
+    if column != order_by:
+        raise ValueError(
+            f"Resume token was issued for order_by={column!r}, not {order_by!r}"
+        )
+    return value, user_id
+
+
+def keyset_page_query(order_by="user_id", first_page=False):
+    """
+    Builds the parameterised SQL for one keyset page.
+
+    Args:
+        order_by (str): One of KEYSET_COLUMNS.
+        first_page (bool): Build the query without a seek predicate.
+
+    Returns:
+        str: SQL taking the seek key (unless first_page) and then the page
+        size as %s parameters, in the order keyset_page_params produces.
+    """
+    if order_by not in KEYSET_COLUMNS:
+        raise ValueError(f"Cannot paginate on column {order_by!r}")
+
+    if order_by == "user_id":
+        order_clause = "user_id"
+        where_clause = "WHERE user_id > %s"
+    else:
+        order_clause = f"{order_by}, user_id"
+        # Either form is a range scan on the (order_by, user_id) index that
+        # seed.add_keyset_indexes creates, but each backend only recognises
+        # one of them (see supports_row_value_seek).
+        if get_backend().supports_row_value_seek:
+            where_clause = f"WHERE ({order_by}, user_id) > (%s, %s)"
+        else:
+            where_clause = (
+                f"WHERE {order_by} > %s OR ({order_by} = %s AND user_id > %s)"
+            )
+
+    return (
+        "SELECT user_id, name, email, age FROM user_data "
+        f"{'' if first_page else where_clause} "
+        f"ORDER BY {order_clause} LIMIT %s"
+    )
+
+
+def keyset_page_params(page_size, order_by="user_id", after=None):
+    """Returns the parameters matching keyset_page_query(order_by, not after)."""
+    if not after:
+        return (page_size,)
+    if order_by == "user_id":
+        return (after[1], page_size)
+    if get_backend().supports_row_value_seek:
+        return (after[0], after[1], page_size)
+    return (after[0], after[0], after[1], page_size)
+
+
+def paginate_users_keyset(page_size, order_by="user_id", after=None):
+    """
+    Fetches the page of users that follows a given key (seek pagination).
+
+    Rather than skipping `offset` rows on the server, the query seeks
+    straight to the first row after `after` on the (order_by, user_id)
+    ordering, so every page costs the same no matter how deep it is. For
+    any order_by but user_id that takes the index seed.add_keyset_indexes
+    creates.
+    user_id is always the final tie-breaker, which keeps the order total
+    and stable when order_by has duplicate values.
+
+    Args:
+        page_size (int): The maximum number of rows to return.
+        order_by (str): One of KEYSET_COLUMNS.
+        after (tuple): The (order_by value, user_id) of the last row already
+            seen, or None for the first page.
+
+    Returns:
+        list: A list of user dictionaries.
+    """
+    query = keyset_page_query(order_by, first_page=not after)
+
+    with pooled_connection() as connection:
+        if not connection:
+            return []
 
+        cursor = connection.cursor(dictionary=True)
+        try:
+            cursor.execute(query, keyset_page_params(page_size, order_by, after))
+            return cursor.fetchall()
+        except DatabaseError as err:
+            print(f"Database query error: {err}")
+            return []
+        finally:
+            cursor.close()
 
-def lazy_pagination(page_size):
+
+def lazy_pagination(page_size, keyset=False, order_by="user_id",
+                    resume_token=None):
     """
     Generator that lazily loads pages of user data from the database.
 
+    One pooled connection and one server-side prepared statement are held
+    for the whole traversal; the page size and the OFFSET / seek key are bound as
+    statement parameters on every page. Both are released when the
+    generator is exhausted, closed, or garbage-collected.
+
     Args:
         page_size (int): The number of users per page.
+        keyset (bool): Seek from the last row seen instead of using OFFSET.
+            Walking the whole table is then linear rather than quadratic.
+        order_by (str): Column to order keyset pages on (keyset mode only).
+            Columns other than user_id need seed.add_keyset_indexes.
+        resume_token (str): Token from encode_resume_token to continue a
+            previous keyset traversal after its last yielded page.
 
     Yields:
         list: A page (list of user dictionaries) of data.
     """
     # Start at the beginning of the table
     offset = 0
-    
-    # Only ONE loop is allowed
-    while True:
-        # 1. Fetch the next page of data
-        page = paginate_users(page_size, offset)
-        
-        # 2. Termination condition: If the page is empty, we've reached the end
-        if not page:
-            break
-            
-        # 3. Yield the entire page (a list of dictionaries)
-        # Execution pauses here until the next page is requested
-        yield page
-        
-        # 4. Update the offset for the next page fetch
-        offset += page_size
\ No newline at end of file
+    if resume_token and not keyset:
+        raise ValueError("resume_token is only supported with keyset=True")
+    after = decode_resume_token(resume_token, order_by) if resume_token else None
+    if keyset:
+        # Built once (validating order_by before any connection is opened)
+        # so every page executes the same statement text.
+        first_page_query = keyset_page_query(order_by, first_page=True)
+        next_page_query = keyset_page_query(order_by)
+
+    with pooled_connection() as connection:
+        if not connection:
+            return
+
+        # prepared=True makes the connector PREPARE the statement once on the
+        # server and only send the bound parameters for every later page. The
+        # keyset query gains its seek predicate after the first page, which
+        # costs exactly one re-prepare.
+        cursor = connection.cursor(prepared=True, dictionary=True)
+        offset_query = (
+            "SELECT user_id, name, email, age FROM user_data LIMIT %s OFFSET %s"
+        )
+
+        try:
+            # Only ONE loop is allowed
+            while True:
+                # 1. Fetch the next page of data
+                if keyset:
+                    cursor.execute(
+                        next_page_query if after else first_page_query,
+                        keyset_page_params(page_size, order_by, after),
+                    )
+                else:
+                    cursor.execute(offset_query, (page_size, offset))
+                page = cursor.fetchall()
+
+                # 2. Termination condition: If the page is empty, we've reached the end
+                if not page:
+                    break
+
+                # 3. Yield the entire page (a list of dictionaries)
+                # Execution pauses here until the next page is requested
+                yield page
+
+                # 4. Move the cursor past this page for the next fetch
+                offset += page_size
+                after = (page[-1][order_by], page[-1]["user_id"])
+
+        except DatabaseError as err:
+            print(f"Database query error: {err}")
+
+        finally:
+            # Runs on exhaustion, on close() and when the generator is
+            # collected. Closing the cursor deallocates the prepared
+            # statement; the connection goes back to the pool.
+            cursor.close()
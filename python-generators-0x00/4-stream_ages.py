@@ -1,5 +1,4 @@
-from seed import connect_to_prodev
-import mysql.connector
+from seed import DatabaseError, close_cursor, get_backend, pooled_connection
 
 def stream_user_ages():
     """
@@ -8,31 +7,30 @@ def stream_user_ages():
     Yields:
         int: The age of a single user.
     """
-    connection = connect_to_prodev()
-    if not connection:
-        return
+    with pooled_connection() as connection:
+        if not connection:
+            return
 
-    # Use buffered=False for server-side cursor to stream results one by one
-    cursor = connection.cursor(buffered=False) 
-    
-    # Query only the 'age' column
-    query = "SELECT age FROM user_data"
-
-    try:
-        cursor.execute(query)
+        # Server-side cursor to stream results one by one
+        cursor = get_backend().server_cursor(connection)
         
-        # Loop 1: Iterates over the results being streamed from the database
-        for (age,) in cursor:
-            # Yield only the age (the result of the SELECT query is a tuple (age,))
-            yield age
+        # Query only the 'age' column
+        query = "SELECT age FROM user_data"
+
+        try:
+            cursor.execute(query)
             
-    except mysql.connector.Error as err:
-        print(f"Error executing query: {err}")
-        
-    finally:
-        # Crucial to close resources
-        cursor.close()
-        connection.close()
+            # Loop 1: Iterates over the results being streamed from the database
+            for (age,) in cursor:
+                # Yield only the age (the result of the SELECT query is a tuple (age,))
+                yield age
+                
+        except DatabaseError as err:
+            print(f"Error executing query: {err}")
+            
+        finally:
+            # Crucial to close the cursor; the pool takes the connection back
+            close_cursor(cursor)
 
 
 def calculate_average_age():
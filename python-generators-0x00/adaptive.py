@@ -0,0 +1,112 @@
+"""
+Adaptive fetchmany sizing.
+
+A BatchSizer picks the size of the next fetchmany from what the previous
+ones cost. It aims for batches that take about `target_latency` seconds to
+fetch: small batches waste a round trip's fixed cost on a handful of rows,
+huge ones make the consumer wait and hold many rows in memory at once.
+The size grows at most GROWTH_LIMIT-fold per batch, shrinks in proportion
+when a fetch overshoots the target, stays within [min_size, max_size] and
+never exceeds what fits into `max_bytes` at the observed row width.
+
+Size changes are logged at INFO level on the "adaptive" logger:
+
+    logging.basicConfig(level=logging.INFO)
+"""
+import logging
+
+logger = logging.getLogger(__name__)
+
+ADAPTIVE_INITIAL_SIZE = 100
+ADAPTIVE_MIN_SIZE = 10
+ADAPTIVE_MAX_SIZE = 50000
+ADAPTIVE_TARGET_LATENCY = 0.05
+ADAPTIVE_MAX_BYTES = 8 * 1024 * 1024
+
+GROWTH_LIMIT = 2.0
+# Weight of the newest observation in the smoothed per-row byte estimate.
+SMOOTHING = 0.3
+
+
+def row_bytes(row):
+    """Approximate payload size of one row (dict, tuple or sequence)."""
+    values = row.values() if isinstance(row, dict) else row
+    size = 0
+    for value in values:
+        if isinstance(value, (str, bytes)):
+            size += len(value)
+        else:
+            size += 8
+    return size
+
+
+class BatchSizer:
+    """
+    Chooses fetchmany sizes toward a latency target under a memory budget.
+
+    Call size to get the next batch size, then observe() with what that
+    fetch returned and how long it took.
+
+    Args:
+        initial (int): Size of the first fetch.
+        min_size (int): Smallest size ever chosen.
+        max_size (int): Largest size ever chosen.
+        target_latency (float): Seconds one fetch should take.
+        max_bytes (int): Memory budget for one batch's row payload.
+    """
+
+    def __init__(self, initial=ADAPTIVE_INITIAL_SIZE, min_size=ADAPTIVE_MIN_SIZE,
+                 max_size=ADAPTIVE_MAX_SIZE, target_latency=ADAPTIVE_TARGET_LATENCY,
+                 max_bytes=ADAPTIVE_MAX_BYTES):
+        if not 0 < min_size <= max_size:
+            raise ValueError("Need 0 < min_size <= max_size")
+        self.min_size = min_size
+        self.max_size = max_size
+        self.target_latency = target_latency
+        self.max_bytes = max_bytes
+        self.size = min(max(initial, min_size), max_size)
+        self.bytes_per_row = None
+        self.history = [self.size]
+
+    def observe(self, rows, seconds, sample=None):
+        """
+        Updates the size from one completed fetch.
+
+        Args:
+            rows (int): Rows the fetch returned.
+            seconds (float): How long the fetch took.
+            sample (list): Some of the fetched rows, to estimate row width.
+
+        Returns:
+            int: The size for the next fetch.
+        """
+        if sample:
+            width = sum(row_bytes(row) for row in sample) / len(sample)
+            self.bytes_per_row = width if self.bytes_per_row is None else \
+                SMOOTHING * width + (1 - SMOOTHING) * self.bytes_per_row
+
+        # A short batch means the result set ran out, which says nothing
+        # about the cost of a full one.
+        if rows < self.size:
+            return self.size
+
+        factor = self.target_latency / seconds if seconds > 0 else GROWTH_LIMIT
+        size = int(self.size * min(factor, GROWTH_LIMIT))
+        if self.bytes_per_row:
+            size = min(size, int(self.max_bytes / self.bytes_per_row))
+        size = min(max(size, self.min_size), self.max_size)
+
+        if size != self.size:
+            logger.info("fetchmany size %d -> %d (%.1f ms for %d rows, ~%s B/row)",
+                        self.size, size, seconds * 1000, rows,
+                        round(self.bytes_per_row) if self.bytes_per_row else "?")
+            self.size = size
+        self.history.append(size)
+        return size
+
+
+def sample_rows(batch):
+    """First, middle and last row of a batch, for BatchSizer.observe."""
+    if len(batch) <= 3:
+        return list(batch)
+    return [batch[0], batch[len(batch) // 2], batch[-1]]
@@ -0,0 +1,261 @@
+from array import array
+from collections import Counter
+
+from seed import DatabaseError, close_cursor, get_backend, pooled_connection
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; array/builtins are the fallback
+    np = None
+
+# Numeric columns that may be aggregated. Column names are spliced into the
+# SQL text, so they must come from this list.
+NUMERIC_COLUMNS = ("age",)
+
+# Aggregates MySQL computes directly, mapped to their SQL function.
+SQL_AGGREGATES = {
+    "avg": "AVG",
+    "min": "MIN",
+    "max": "MAX",
+    "count": "COUNT",
+    "sum": "SUM",
+}
+
+AGE_BLOCK_SIZE = 10000
+
+
+def _check_column(column):
+    if column not in NUMERIC_COLUMNS:
+        raise ValueError(f"Cannot aggregate column {column!r}")
+
+
+def _query(query, params=()):
+    """Runs a small query on a pooled connection and returns all rows."""
+    with pooled_connection() as connection:
+        if not connection:
+            return []
+        cursor = connection.cursor()
+        try:
+            cursor.execute(query, params)
+            return cursor.fetchall()
+        finally:
+            cursor.close()
+
+
+def sql_aggregate(name, column="age"):
+    """
+    Computes avg/min/max/count/sum on the server.
+
+    Only the single result value crosses the network.
+
+    Args:
+        name (str): One of SQL_AGGREGATES.
+        column (str): One of NUMERIC_COLUMNS.
+
+    Returns:
+        The aggregate (None for an empty table, except count).
+    """
+    _check_column(column)
+    if name not in SQL_AGGREGATES:
+        raise ValueError(f"{name!r} cannot be pushed down to SQL")
+    rows = _query(f"SELECT {SQL_AGGREGATES[name]}({column}) FROM user_data")
+    value = rows[0][0] if rows else None
+    # AVG/SUM come back as Decimal; keep results plain numbers.
+    return float(value) if name == "avg" and value is not None else value
+
+
+def sql_histogram(bucket_width=10, column="age"):
+    """
+    Counts rows per fixed-width bucket with a GROUP BY on the server.
+
+    Returns:
+        dict: Bucket lower bound -> row count, in ascending bucket order.
+    """
+    _check_column(column)
+    rows = _query(
+        f"SELECT {column} - MOD({column}, %s) AS bucket, COUNT(*) "
+        "FROM user_data GROUP BY bucket ORDER BY bucket",
+        (bucket_width,),
+    )
+    return {int(bucket): count for bucket, count in rows}
+
+
+def sql_percentiles(percentiles, column="age"):
+    """
+    Finds exact nearest-rank percentiles with one sorted pass on the server.
+
+    MySQL has no PERCENTILE_CONT, so the row count is read first. A single
+    query then numbers the rows in ORDER BY column with ROW_NUMBER() and
+    returns only the rows at the requested ranks: one sort for all the
+    percentiles, and only those values cross the network.
+
+    Args:
+        percentiles (iterable): Percentiles between 0 and 100.
+
+    Returns:
+        dict: Percentile -> value (empty for an empty table).
+    """
+    _check_column(column)
+    percentiles = list(percentiles)
+    count = sql_aggregate("count", column)
+    if not count or not percentiles:
+        return {}
+    ranks = {p: _nearest_rank(p, count) for p in percentiles}
+    wanted = sorted(set(ranks.values()))
+    rows = _query(
+        f"SELECT row_rank, {column} FROM ("
+        f"SELECT {column}, ROW_NUMBER() OVER (ORDER BY {column}) - 1 AS row_rank "
+        "FROM user_data) ranked "
+        f"WHERE row_rank IN ({', '.join(['%s'] * len(wanted))})",
+        wanted,
+    )
+    values = {rank: value for rank, value in rows}
+    return {p: values.get(rank) for p, rank in ranks.items()}
+
+
+def _nearest_rank(p, count):
+    """Zero-based index of percentile p among `count` sorted values."""
+    if not 0 <= p <= 100:
+        raise ValueError(f"Percentile {p} is outside 0..100")
+    return int(min(count - 1, max(0, -(-p * count // 100) - 1)))
+
+
+def stream_age_blocks(block_size=AGE_BLOCK_SIZE, column="age"):
+    """
+    Generator that streams a numeric column in packed blocks.
+
+    Each fetchmany block is copied into an array('i') (4 bytes per value)
+    instead of being handed out as one Python tuple per row.
+
+    Yields:
+        array: A block of up to block_size values.
+    """
+    _check_column(column)
+    with pooled_connection() as connection:
+        if not connection:
+            return
+
+        cursor = get_backend().server_cursor(connection)
+        try:
+            cursor.execute(f"SELECT {column} FROM user_data")
+            while True:
+                rows = cursor.fetchmany(block_size)
+                if not rows:
+                    break
+                yield array('i', [value for (value,) in rows])
+        except DatabaseError as err:
+            print(f"Error executing query: {err}")
+        finally:
+            close_cursor(cursor)
+
+
+class BlockReducer:
+    """
+    Running count/sum/min/max plus an exact value histogram over blocks.
+
+    Blocks are reduced with NumPy when it is installed and with the
+    C-implemented builtins over array('i') otherwise. The value histogram
+    holds one counter per distinct value, so exact percentiles cost memory
+    proportional to the number of distinct ages, not the number of rows.
+    """
+
+    def __init__(self, track_values=False):
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+        self.track_values = track_values
+        self.values = Counter()
+
+    def add(self, block):
+        """Folds one array('i') block into the running aggregates."""
+        if not block:
+            return
+        if np is not None:
+            values = np.frombuffer(block, dtype=np.int32)
+            total = int(values.sum(dtype=np.int64))
+            low, high = int(values.min()), int(values.max())
+        else:
+            total, low, high = sum(block), min(block), max(block)
+        self.count += len(block)
+        self.total += total
+        self.min = low if self.min is None else min(self.min, low)
+        self.max = high if self.max is None else max(self.max, high)
+        if self.track_values:
+            if np is not None:
+                distinct, counts = np.unique(values, return_counts=True)
+                self.values.update(dict(zip(distinct.tolist(), counts.tolist())))
+            else:
+                self.values.update(block)
+
+    @property
+    def avg(self):
+        return self.total / self.count if self.count else None
+
+    def histogram(self, bucket_width=10):
+        """Bucket lower bound -> count, from the tracked value counts."""
+        buckets = Counter()
+        for value, count in self.values.items():
+            buckets[value // bucket_width * bucket_width] += count
+        return dict(sorted(buckets.items()))
+
+    def percentile(self, p):
+        """Exact nearest-rank percentile from the tracked value counts."""
+        if not self.count:
+            return None
+        rank = _nearest_rank(p, self.count)
+        seen = 0
+        for value in sorted(self.values):
+            seen += self.values[value]
+            if seen > rank:
+                return value
+        return None
+
+
+def client_reduce(block_size=AGE_BLOCK_SIZE, column="age", track_values=False):
+    """Streams `column` in blocks and returns the filled BlockReducer."""
+    reducer = BlockReducer(track_values)
+    for block in stream_age_blocks(block_size, column):
+        reducer.add(block)
+    return reducer
+
+
+def aggregate(name, column="age", pushdown=True, block_size=AGE_BLOCK_SIZE,
+              bucket_width=10, percentiles=(50, 95, 99)):
+    """
+    Computes an aggregate over user_data, on the server where possible.
+
+    Args:
+        name (str): "avg", "min", "max", "count", "sum", "histogram" or
+            "percentiles".
+        column (str): One of NUMERIC_COLUMNS.
+        pushdown (bool): Let MySQL compute it. With False the column is
+            streamed in blocks and reduced client-side.
+        block_size (int): Rows per fetchmany block in client mode.
+        bucket_width (int): Bucket width for "histogram".
+        percentiles (iterable): Percentiles for "percentiles".
+
+    Returns:
+        The aggregate value, histogram dict or percentile dict.
+    """
+    if pushdown:
+        if name == "histogram":
+            return sql_histogram(bucket_width, column)
+        if name == "percentiles":
+            return sql_percentiles(percentiles, column)
+        return sql_aggregate(name, column)
+
+    if name not in SQL_AGGREGATES and name not in ("histogram", "percentiles"):
+        raise ValueError(f"Unknown aggregate {name!r}")
+    reducer = client_reduce(block_size, column,
+                            track_values=name in ("histogram", "percentiles"))
+    if name == "histogram":
+        return reducer.histogram(bucket_width)
+    if name == "percentiles":
+        return {p: reducer.percentile(p) for p in percentiles}
+    return reducer.total if name == "sum" else getattr(reducer, name)
+
+
+def average_age(pushdown=True):
+    """Average user age; the drop-in fast path for calculate_average_age."""
+    return aggregate("avg", pushdown=pushdown)
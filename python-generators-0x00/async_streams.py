@@ -0,0 +1,225 @@
+"""
+asyncio equivalents of the python-generators streaming API.
+
+Each function here is an async generator with the same arguments and the
+same yielded values as its synchronous counterpart:
+
+    stream_users()                      -> 0-stream_users.stream_users
+    stream_users_in_batches(batch_size) -> 1-batch_processing.stream_users_in_batches
+    lazy_pagination(page_size)          -> 2-lazy_paginate.lazy_pagination
+    stream_user_ages()                  -> 4-stream_ages.stream_user_ages
+
+They run on aiomysql (pip install aiomysql) with server-side (unbuffered)
+cursors, so a scan only reads from the socket when the consumer asks for
+more rows: a slow consumer applies backpressure all the way to the server
+through TCP flow control instead of buffering the result set in memory.
+They always talk to MySQL, whatever PRODEV_BACKEND selects.
+Several scans can run concurrently on one event loop:
+
+    async def main():
+        async for user in stream_users():
+            ...
+"""
+import asyncio
+
+from predicates import build_select
+from seed import DATABASE_NAME, DB_CONFIG, POOL_SIZE
+
+try:
+    import aiomysql
+except ImportError:  # Only needed when the async API is actually used
+    aiomysql = None
+
+paginate = __import__('2-lazy_paginate')
+
+STREAM_FETCH_SIZE = 1000
+
+_pool = None
+_pool_loop = None
+
+
+def _require_driver():
+    if aiomysql is None:
+        raise ImportError(
+            "The async streaming API needs aiomysql: pip install aiomysql"
+        )
+
+
+async def get_async_pool(maxsize=POOL_SIZE):
+    """
+    Returns the aiomysql pool for the running event loop, creating it lazily.
+
+    The connection settings are taken from seed.DB_CONFIG.
+    """
+    global _pool, _pool_loop
+    _require_driver()
+    loop = asyncio.get_running_loop()
+    if _pool is None or _pool_loop is not loop:
+        _pool = await aiomysql.create_pool(
+            host=DB_CONFIG['host'],
+            port=DB_CONFIG['port'],
+            user=DB_CONFIG['user'],
+            password=DB_CONFIG['password'],
+            db=DATABASE_NAME,
+            autocommit=DB_CONFIG['autocommit'],
+            minsize=0,
+            maxsize=maxsize,
+        )
+        _pool_loop = loop
+    return _pool
+
+
+async def close_async_pool():
+    """Closes the pool of the running event loop, if one was created."""
+    global _pool, _pool_loop
+    if _pool is not None:
+        _pool.close()
+        await _pool.wait_closed()
+        _pool = _pool_loop = None
+
+
+async def _scan(query, params, cursor_class, fetch_size):
+    """
+    Async generator over the batches of an unbuffered query.
+
+    If the consumer stops early, the connection is closed rather than
+    draining the unread rows (which is what closing an SSCursor would do),
+    and the pool drops it on release.
+    """
+    pool = await get_async_pool()
+    connection = await pool.acquire()
+    finished = False
+    try:
+        cursor = await connection.cursor(cursor_class)
+        await cursor.execute(query, params)
+        while True:
+            rows = await cursor.fetchmany(fetch_size)
+            if not rows:
+                break
+            yield rows
+        await cursor.close()
+        finished = True
+    except aiomysql.Error as err:
+        print(f"Error executing query: {err}")
+    finally:
+        if not finished:
+            connection.close()
+        pool.release(connection)
+
+
+async def stream_users(fetch_size=STREAM_FETCH_SIZE):
+    """
+    Async generator that yields user_data rows one by one.
+
+    Rows are read from the server in chunks of fetch_size, only as fast as
+    they are consumed.
+
+    Yields:
+        dict: One user row.
+    """
+    _require_driver()
+    scan = _scan("SELECT user_id, name, email, age FROM user_data", (),
+                 aiomysql.SSDictCursor, fetch_size)
+    try:
+        async for rows in scan:
+            for row in rows:
+                yield row
+    finally:
+        await scan.aclose()
+
+
+async def stream_users_in_batches(batch_size, filters=None, columns=None):
+    """
+    Async generator that yields user_data rows in batches.
+
+    Filters and columns are compiled exactly as in the synchronous version.
+
+    Yields:
+        list: A list of user dictionaries (one batch).
+    """
+    _require_driver()
+    query, params, residual = build_select(columns, filters)
+    scan = _scan(query, params, aiomysql.SSDictCursor, batch_size)
+    try:
+        async for batch in scan:
+            if residual:
+                batch = [row for row in batch
+                         if all(predicate(row) for predicate in residual)]
+                if not batch:
+                    continue
+            yield batch
+    finally:
+        await scan.aclose()
+
+
+async def lazy_pagination(page_size, keyset=False, order_by="user_id",
+                          resume_token=None):
+    """
+    Async generator that lazily loads pages of user data.
+
+    One pooled connection is held for the whole traversal. Keyset mode,
+    order_by and resume tokens behave as in 2-lazy_paginate.py.
+
+    Yields:
+        list: A page (list of user dictionaries) of data.
+    """
+    _require_driver()
+    if resume_token and not keyset:
+        raise ValueError("resume_token is only supported with keyset=True")
+    after = (paginate.decode_resume_token(resume_token, order_by)
+             if resume_token else None)
+    if keyset:
+        paginate.keyset_page_query(order_by)
+
+    offset = 0
+    offset_query = (
+        "SELECT user_id, name, email, age FROM user_data LIMIT %s OFFSET %s"
+    )
+
+    pool = await get_async_pool()
+    async with pool.acquire() as connection:
+        async with connection.cursor(aiomysql.DictCursor) as cursor:
+            try:
+                while True:
+                    if keyset:
+                        await cursor.execute(
+                            paginate.keyset_page_query(order_by, first_page=not after),
+                            paginate.keyset_page_params(page_size, order_by, after),
+                        )
+                    else:
+                        await cursor.execute(offset_query, (page_size, offset))
+                    page = await cursor.fetchall()
+                    if not page:
+                        break
+                    yield list(page)
+                    offset += page_size
+                    after = (page[-1][order_by], page[-1]["user_id"])
+            except aiomysql.Error as err:
+                print(f"Database query error: {err}")
+
+
+async def stream_user_ages(fetch_size=STREAM_FETCH_SIZE):
+    """
+    Async generator that yields user ages one by one.
+
+    Yields:
+        int: The age of a single user.
+    """
+    _require_driver()
+    scan = _scan("SELECT age FROM user_data", (), aiomysql.SSCursor, fetch_size)
+    try:
+        async for rows in scan:
+            for (age,) in rows:
+                yield age
+    finally:
+        await scan.aclose()
+
+
+async def calculate_average_age():
+    """Async counterpart of 4-stream_ages.calculate_average_age."""
+    total_age = 0
+    user_count = 0
+    async for age in stream_user_ages():
+        total_age += age
+        user_count += 1
+    return total_age / user_count if user_count else 0.0
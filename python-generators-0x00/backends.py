@@ -0,0 +1,409 @@
+"""
+Storage backends for seed.py and the generators: MySQL and SQLite.
+
+seed.get_backend() picks one from the environment (see seed.py):
+
+    PRODEV_BACKEND=mysql    mysql.connector and the ALX_prodev database (default)
+    PRODEV_BACKEND=sqlite   a local SQLite file, PRODEV_SQLITE_PATH
+
+A backend opens connections and owns the few operations whose SQL differs
+between the two: the idempotent bulk insert, schema introspection, the
+table change token and cancelling another thread's connection. Everything else - server-side cursors, fetchmany,
+keyset pages - is written once against the mysql.connector connection API,
+which SQLiteConnection reproduces, so every generator runs unchanged on
+either backend.
+
+The SQLite backend runs in WAL mode with the pragmas in SQLITE_PRAGMAS, so
+readers never block the writer and streaming scans read straight from
+mmap'd pages. MySQL-only features (LOAD DATA, change tracking and the
+aiomysql streams) report themselves as unsupported there.
+
+mysql.connector is only needed for the MySQL backend. Database errors from
+either backend are DatabaseError (mysql.connector.Error when it is
+installed), which is what callers catch.
+"""
+import math
+import os
+import sqlite3
+
+try:
+    import mysql.connector
+except ImportError:  # Only the SQLite backend is usable without it
+    mysql = None
+
+if mysql is not None:
+    DatabaseError = mysql.connector.Error
+else:
+    class DatabaseError(Exception):
+        """Base database error, standing in for mysql.connector.Error."""
+
+        def __init__(self, msg=None, errno=None):
+            super().__init__(msg)
+            self.msg = msg
+            self.errno = errno
+
+
+class SQLiteError(DatabaseError):
+    """A sqlite3 error, raised as the package's DatabaseError."""
+
+
+BACKENDS = ("mysql", "sqlite")
+
+INSERT_QUERY = "INSERT INTO user_data (user_id, name, email, age) VALUES (%s, %s, %s, %s)"
+# Re-inserting an existing user_id is a silent no-op. (INSERT IGNORE would
+# raise under raise_on_warnings, and VALUES() in the update is deprecated.)
+MYSQL_INSERT_IDEMPOTENT_QUERY = INSERT_QUERY + " ON DUPLICATE KEY UPDATE user_id = user_id"
+SQLITE_INSERT_IDEMPOTENT_QUERY = INSERT_QUERY + " ON CONFLICT (user_id) DO NOTHING"
+
+SQLITE_PATH = "prodev.sqlite3"
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",       # readers and the writer do not block each other
+    "synchronous": "NORMAL",     # fsync at checkpoints only; safe with WAL
+    "temp_store": "MEMORY",
+    "cache_size": -64 * 1024,    # 64 MiB page cache (negative = KiB)
+    "mmap_size": 256 * 1024 * 1024,
+    "busy_timeout": 5000,        # ms to wait for a lock, e.g. parallel ingest
+}
+
+
+class MySQLBackend:
+    """The ALX_prodev database on a MySQL server, via mysql.connector."""
+
+    name = "mysql"
+    supports_local_infile = True
+    supports_change_tracking = True
+    # The range optimizer handles the expanded OR form of a keyset seek,
+    # not (a, b) > (x, y) row comparisons.
+    supports_row_value_seek = False
+
+    def __init__(self, config, database):
+        """
+        Args:
+            config (dict): mysql.connector.connect arguments.
+            database (str): Schema the generators read from.
+        """
+        self.config = config
+        self.database = database
+
+    def connect(self, database=True, **options):
+        """
+        Opens a connection; raises DatabaseError on failure.
+
+        Args:
+            database (bool): Select self.database (False for the server-level
+                connection used to create it).
+            **options: Per-connection overrides, e.g. allow_local_infile.
+        """
+        if mysql is None:
+            raise DatabaseError("The MySQL backend needs mysql-connector-python")
+        config = dict(self.config)
+        if database:
+            config['database'] = self.database
+        config.update(options)
+        return mysql.connector.connect(**config)
+
+    def create_database(self, cursor):
+        cursor.execute(f"CREATE DATABASE IF NOT EXISTS {self.database}")
+
+    def server_cursor(self, connection, dictionary=False):
+        """An unbuffered cursor: rows stream from the server on fetch."""
+        return connection.cursor(dictionary=dictionary, buffered=False)
+
+    def bulk_insert(self, cursor, rows):
+        """Inserts (user_id, name, email, age) rows, skipping existing ids."""
+        cursor.executemany(MYSQL_INSERT_IDEMPOTENT_QUERY, rows)
+
+    def has_column(self, cursor, table, column):
+        cursor.execute(
+            "SELECT COUNT(*) FROM information_schema.COLUMNS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s "
+            "AND COLUMN_NAME = %s",
+            (table, column),
+        )
+        return bool(cursor.fetchone()[0])
+
+    def has_index(self, cursor, table, index):
+        cursor.execute(
+            "SELECT COUNT(*) FROM information_schema.STATISTICS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s "
+            "AND INDEX_NAME = %s",
+            (table, index),
+        )
+        return bool(cursor.fetchone()[0])
+
+    def cancel(self, connection):
+        """
+        Kills another connection's session from a fresh connection.
+
+        The server drops its result set and locks at once; the owner's next
+        read fails with a lost-connection error.
+        """
+        killer = self.connect()
+        try:
+            cursor = killer.cursor()
+            cursor.execute(f"KILL CONNECTION {int(connection.connection_id)}")
+            cursor.close()
+        finally:
+            killer.close()
+
+    def change_token(self, cursor, table):
+        """
+        A value that changes with the table's contents.
+
+        Normally the table's UPDATE_TIME from information_schema, which
+        reads no rows. CHECKSUM TABLE, a full table read, stands in while
+        UPDATE_TIME is unusable: NULL (InnoDB keeps it in memory only, so
+        after a restart until the next write), or less than a second old,
+        as a second write within that second would not move it.
+        """
+        try:
+            # MySQL 8 otherwise serves table statistics from a cache that
+            # is refreshed once a day.
+            cursor.execute("SET SESSION information_schema_stats_expiry = 0")
+        except DatabaseError:
+            pass  # MySQL 5.7: no such cache
+        cursor.execute(
+            "SELECT UPDATE_TIME, UPDATE_TIME < NOW() - INTERVAL 1 SECOND "
+            "FROM information_schema.TABLES "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+            (table,),
+        )
+        row = cursor.fetchone()
+        if row and row[0] is not None and row[1]:
+            return f"updated:{row[0]}"
+        cursor.execute(f"CHECKSUM TABLE {table}")
+        return f"checksum:{cursor.fetchone()[1]}"
+
+
+class SQLiteBackend:
+    """A local SQLite file standing in for ALX_prodev."""
+
+    name = "sqlite"
+    supports_local_infile = False
+    supports_change_tracking = False
+    # The planner seeks an index with (a, b) > (x, y) but walks it from the
+    # start for the expanded OR form.
+    supports_row_value_seek = True
+
+    def __init__(self, path=SQLITE_PATH, pragmas=None):
+        self.path = path
+        self.pragmas = SQLITE_PRAGMAS if pragmas is None else pragmas
+
+    def connect(self, database=True, **options):
+        """
+        Opens the database file (created if missing); raises DatabaseError.
+
+        MySQL connection options such as allow_local_infile are ignored.
+        """
+        try:
+            return SQLiteConnection(self.path, self.pragmas)
+        except sqlite3.Error as err:
+            raise SQLiteError(msg=f"{self.path}: {err}") from err
+
+    def create_database(self, cursor):
+        """Nothing to do: the file is the database."""
+
+    def server_cursor(self, connection, dictionary=False):
+        # sqlite3 always steps through results lazily.
+        return connection.cursor(dictionary=dictionary)
+
+    def bulk_insert(self, cursor, rows):
+        cursor.executemany(SQLITE_INSERT_IDEMPOTENT_QUERY, rows)
+
+    def has_column(self, cursor, table, column):
+        cursor.execute(f"PRAGMA table_info({table})")
+        return any(row[1] == column for row in cursor.fetchall())
+
+    def has_index(self, cursor, table, index):
+        cursor.execute(f"PRAGMA index_list({table})")
+        return any(row[1] == index for row in cursor.fetchall())
+
+    def cancel(self, connection):
+        """
+        Closes a connection that another thread is reading from.
+
+        This ends its read transaction, which otherwise holds back WAL
+        checkpoints. It is meant for a connection whose reader is
+        suspended, such as a stalled scan.
+        """
+        connection.close()
+
+    def change_token(self, cursor, table):
+        """
+        Modification times of the database file and its WAL.
+
+        SQLite has no table checksum; any committed write touches one of
+        the two files, so this changes at least as often as the table.
+        """
+        stamps = []
+        for path in (self.path, f"{self.path}-wal"):
+            try:
+                stat = os.stat(path)
+                stamps.append(f"{stat.st_mtime_ns}.{stat.st_size}")
+            except FileNotFoundError:
+                stamps.append("-")
+        return "files:" + ":".join(stamps)
+
+
+def translate(query):
+    """
+    Rewrites mysql.connector's %s placeholders as sqlite3's ?.
+
+    Nothing else is touched: mysql.connector sends any other % text to the
+    server as written (%% is not an escape there), and so does this, so a
+    query means the same on both backends. Dialect differences are not
+    translated; they live in the backend methods, e.g. bulk_insert.
+    """
+    return query.replace("%s", "?")
+
+
+def _mod(x, y):
+    """SQL MOD: NULL for NULL or zero divisor, sign of the dividend."""
+    if x is None or not y:
+        return None
+    return math.fmod(x, y)
+
+
+class SQLiteCursor:
+    """A sqlite3 cursor with mysql.connector's cursor options and %s params."""
+
+    def __init__(self, connection, dictionary=False):
+        self._cursor = connection._raw.cursor()
+        self._dictionary = dictionary
+        self._names = None
+
+    def execute(self, query, params=()):
+        try:
+            self._cursor.execute(translate(query), tuple(params or ()))
+        except sqlite3.Error as err:
+            raise SQLiteError(msg=str(err)) from err
+        description = self._cursor.description
+        self._names = tuple(column[0] for column in description) if description else None
+
+    def executemany(self, query, seq_params):
+        try:
+            self._cursor.executemany(translate(query), seq_params)
+        except sqlite3.Error as err:
+            raise SQLiteError(msg=str(err)) from err
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    @property
+    def column_names(self):
+        return self._names or ()
+
+    def fetchone(self):
+        try:
+            row = self._cursor.fetchone()
+        except sqlite3.Error as err:
+            raise SQLiteError(msg=str(err)) from err
+        if row is None or not self._dictionary:
+            return row
+        return dict(zip(self._names, row))
+
+    def fetchmany(self, size=1):
+        try:
+            rows = self._cursor.fetchmany(size)
+        except sqlite3.Error as err:
+            raise SQLiteError(msg=str(err)) from err
+        if not self._dictionary:
+            return rows
+        names = self._names
+        return [dict(zip(names, row)) for row in rows]
+
+    def fetchall(self):
+        try:
+            rows = self._cursor.fetchall()
+        except sqlite3.Error as err:
+            raise SQLiteError(msg=str(err)) from err
+        if not self._dictionary:
+            return rows
+        names = self._names
+        return [dict(zip(names, row)) for row in rows]
+
+    def __iter__(self):
+        names = self._names if self._dictionary else None
+        try:
+            for row in self._cursor:
+                yield row if names is None else dict(zip(names, row))
+        except sqlite3.Error as err:  # e.g. the connection was cancelled
+            raise SQLiteError(msg=str(err)) from err
+
+    def close(self):
+        try:
+            self._cursor.close()
+        except sqlite3.Error as err:  # e.g. the connection was cancelled
+            raise SQLiteError(msg=str(err)) from err
+
+
+class SQLiteConnection:
+    """The subset of a mysql.connector connection used in this package."""
+
+    # SQLite cursors never tie up the connection the way an unread MySQL
+    # result set does.
+    unread_result = False
+
+    def __init__(self, path=SQLITE_PATH, pragmas=SQLITE_PRAGMAS):
+        self.path = path
+        # isolation_level=None: transactions are started explicitly, as
+        # with autocommit=True on MySQL. Pooled connections move between
+        # threads, but only one thread uses a connection at a time.
+        self._raw = sqlite3.connect(path, isolation_level=None,
+                                    check_same_thread=False)
+        for pragma, value in pragmas.items():
+            self._raw.execute(f"PRAGMA {pragma} = {value}")
+        try:
+            self._raw.execute("SELECT MOD(1, 1)")
+        except sqlite3.OperationalError:
+            # MOD is one of SQLite's optional math functions. Queries use it
+            # because a literal % cannot sit next to mysql.connector's %s
+            # parameters.
+            self._raw.create_function("MOD", 2, _mod, deterministic=True)
+        self._open = True
+
+    def cursor(self, dictionary=False, buffered=None, prepared=False, **options):
+        # sqlite3 caches prepared statements itself and steps rows lazily,
+        # so buffered/prepared need no special handling.
+        return SQLiteCursor(self, dictionary)
+
+    def start_transaction(self):
+        self._execute("BEGIN")
+
+    def commit(self):
+        if self.in_transaction:
+            self._execute("COMMIT")
+
+    def rollback(self):
+        if self.in_transaction:
+            self._execute("ROLLBACK")
+
+    def _execute(self, statement):
+        try:
+            self._raw.execute(statement)
+        except sqlite3.Error as err:
+            raise SQLiteError(msg=str(err)) from err
+
+    @property
+    def in_transaction(self):
+        # False once closed (e.g. cancelled), so the pool can still take
+        # the connection back and discard it on its health check.
+        return self._open and self._raw.in_transaction
+
+    def is_connected(self):
+        if not self._open:
+            return False
+        try:
+            self._raw.execute("SELECT 1")
+            return True
+        except sqlite3.Error:
+            return False
+
+    def close(self):
+        self._open = False
+        self._raw.close()
@@ -0,0 +1,77 @@
+import sys
+import time
+from contextlib import contextmanager
+
+from adaptive import BatchSizer
+
+batches = __import__('1-batch_processing')
+
+
+class _SlowCursor:
+    """Adds a simulated network round trip to every fetchmany."""
+
+    def __init__(self, cursor, round_trip, per_row):
+        self._cursor = cursor
+        self._round_trip = round_trip
+        self._per_row = per_row
+
+    def fetchmany(self, size=1):
+        rows = self._cursor.fetchmany(size)
+        time.sleep(self._round_trip + self._per_row * len(rows))
+        return rows
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class _SlowConnection:
+    def __init__(self, connection, round_trip, per_row):
+        self._connection = connection
+        self._round_trip = round_trip
+        self._per_row = per_row
+
+    def cursor(self, *args, **kwargs):
+        return _SlowCursor(self._connection.cursor(*args, **kwargs),
+                           self._round_trip, self._per_row)
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+
+def simulate_link(round_trip, per_row):
+    """Makes stream_users_in_batches see a link with the given latency."""
+    real = batches.pooled_connection
+
+    @contextmanager
+    def slow_connection(timeout=None):
+        with real(timeout) as connection:
+            yield _SlowConnection(connection, round_trip, per_row) if connection else connection
+
+    batches.pooled_connection = slow_connection
+
+
+def run(batch_size, adaptive=None):
+    start = time.perf_counter()
+    rows = fetches = 0
+    for batch in batches.stream_users_in_batches(batch_size, adaptive=adaptive):
+        rows += len(batch)
+        fetches += 1
+    return rows, fetches, time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    round_trip = float(sys.argv[1]) if len(sys.argv) > 1 else 0.02
+    per_row = float(sys.argv[2]) if len(sys.argv) > 2 else 0.00001
+    simulate_link(round_trip, per_row)
+    print(f"Simulated link: {round_trip * 1000:.1f} ms per fetch + "
+          f"{per_row * 1e6:.0f} us per row")
+
+    for size in (10, 50, 200):
+        rows, fetches, elapsed = run(size)
+        print(f"fixed {size:>5}: {rows} rows, {fetches} fetches, "
+              f"{rows / elapsed:,.0f} rows/s")
+
+    sizer = BatchSizer(initial=50)
+    rows, fetches, elapsed = run(50, adaptive=sizer)
+    print(f"adaptive   : {rows} rows, {fetches} fetches, "
+          f"{rows / elapsed:,.0f} rows/s, sizes {sizer.history}")
@@ -0,0 +1,57 @@
+import os
+import sys
+import time
+
+import aggregates
+import seed
+from bench_ingest import generate_user_csv, truncate_users
+
+stream_ages = __import__('4-stream_ages')
+
+
+def generator_loop_average():
+    """The calculate_average_age loop: one Python tuple per row."""
+    total_age = 0
+    user_count = 0
+    for age in stream_ages.stream_user_ages():
+        total_age += age
+        user_count += 1
+    return total_age / user_count if user_count else None
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def seed_users(connection, rows):
+    """Reloads user_data with `rows` synthetic users."""
+    data_file = f"bench_users_{rows}.csv"
+    if not os.path.exists(data_file):
+        generate_user_csv(data_file, rows)
+    truncate_users(connection)
+    seed.insert_data(connection, data_file, mode="bulk", checkpoint=False)
+
+
+if __name__ == '__main__':
+    scales = [int(arg) for arg in sys.argv[1:]] or [1_000_000, 10_000_000]
+
+    connection = seed.connect_to_prodev()
+    if not connection:
+        sys.exit(1)
+    seed.create_table(connection)
+
+    for rows in scales:
+        seed_users(connection, rows)
+        contenders = {
+            "generator loop": generator_loop_average,
+            "client blocks": lambda: aggregates.average_age(pushdown=False),
+            "SQL pushdown": lambda: aggregates.average_age(pushdown=True),
+        }
+        print(f"\naverage age over {rows} rows:")
+        for label, func in contenders.items():
+            result, elapsed = timed(func)
+            print(f"  {label:>15}: {elapsed:8.3f} s  (avg {result:.2f})")
+
+    connection.close()
@@ -0,0 +1,54 @@
+import asyncio
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import async_streams
+import seed
+
+stream_users = __import__('0-stream_users')
+
+
+def count_rows_sync():
+    return sum(1 for _ in stream_users.stream_users())
+
+
+async def count_rows_async():
+    count = 0
+    async for _ in async_streams.stream_users():
+        count += 1
+    return count
+
+
+def threaded_scans(scans):
+    """Runs `scans` full scans concurrently, one thread and connection each."""
+    seed.configure_pool(size=scans)
+    with ThreadPoolExecutor(max_workers=scans) as executor:
+        futures = [executor.submit(count_rows_sync) for _ in range(scans)]
+        return sum(future.result() for future in futures)
+
+
+async def asyncio_scans(scans):
+    """Runs `scans` full scans concurrently on the current event loop."""
+    await async_streams.get_async_pool(maxsize=scans)
+    try:
+        counts = await asyncio.gather(*(count_rows_async() for _ in range(scans)))
+    finally:
+        await async_streams.close_async_pool()
+    return sum(counts)
+
+
+if __name__ == '__main__':
+    levels = [int(arg) for arg in sys.argv[1:]] or [1, 4, 16]
+    for scans in levels:
+        start = time.perf_counter()
+        rows = threaded_scans(scans)
+        threaded = time.perf_counter() - start
+
+        start = time.perf_counter()
+        rows_async = asyncio.run(asyncio_scans(scans))
+        concurrent = time.perf_counter() - start
+
+        print(f"{scans:>3} concurrent scans: threads {threaded:7.3f} s "
+              f"({rows / threaded:,.0f} rows/s), asyncio {concurrent:7.3f} s "
+              f"({rows_async / concurrent:,.0f} rows/s)")
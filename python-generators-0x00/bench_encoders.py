@@ -0,0 +1,70 @@
+import json
+import random
+import sys
+import time
+import uuid
+
+import encoders
+from predicates import USER_COLUMNS
+
+FIRST_NAMES = ("Johnnie", "Myrtle", "Glenda", "Daniel", "Zoë", "Ross")
+LAST_NAMES = ("Mayer", "Waters", "Wisozk", "Fahey", "O'Brien", "Funk")
+
+
+def user_rows(count, seed_value=0, uuid_ids=False):
+    """
+    `count` synthetic user dicts in the user_data shape, with user_id a
+    string or, with uuid_ids, a uuid.UUID.
+    """
+    rng = random.Random(seed_value)
+    for _ in range(count):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        user_id = uuid.UUID(int=rng.getrandbits(128), version=4)
+        yield {
+            "user_id": user_id if uuid_ids else str(user_id),
+            "name": f"{first} {last}",
+            "email": f"{first}.{last}{rng.randint(1, 99)}@example.com",
+            "age": rng.randint(18, 120),
+        }
+
+
+def run(encode_batch, batches):
+    start = time.perf_counter()
+    size = 0
+    for batch in batches:
+        size += len(encode_batch(batch))
+    return time.perf_counter() - start, size
+
+
+def bench(count, batch_size, uuid_ids):
+    rows = list(user_rows(count, uuid_ids=uuid_ids))
+    dict_batches = [rows[i:i + batch_size] for i in range(0, count, batch_size)]
+    tuple_batches = [[tuple(row.values()) for row in batch] for batch in dict_batches]
+    # json.dumps rejects UUIDs; default=str writes them as the encoders do.
+    dumps = (lambda row: json.dumps(row, default=str)) if uuid_ids else json.dumps
+
+    compiled = encoders.get_encoder("compiled")
+    mismatches = sum(compiled.row(row) != dumps(row) for row in rows[:10000])
+    print(f"compiled vs json.dumps on 10,000 rows: {mismatches} differences")
+
+    dumps_batch = lambda batch: ("\n".join([dumps(row) for row in batch]) + "\n").encode()
+    elapsed, _ = run(dumps_batch, dict_batches)
+    baseline = elapsed
+    print(f"{'json.dumps':<16} dict : {count / elapsed:>12,.0f} rows/s")
+
+    for name in ("stdlib", "compiled", "orjson"):
+        if name == "orjson" and encoders.orjson is None:
+            print("orjson not installed")
+            continue
+        for row_type, batches in (("dict", dict_batches), ("tuple", tuple_batches)):
+            encoder = encoders.get_encoder(name, USER_COLUMNS, row_type)
+            elapsed, size = run(encoder.batch, batches)
+            print(f"{name:<16} {row_type:<5}: {count / elapsed:>12,.0f} rows/s "
+                  f"({baseline / elapsed:.1f}x), {size:,} bytes")
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    for uuid_ids in (False, True):
+        print(f"user_id as {'uuid.UUID' if uuid_ids else 'str'}:")
+        bench(count, 1000, uuid_ids)
@@ -0,0 +1,41 @@
+import contextlib
+import os
+import sys
+import tempfile
+import time
+
+import export
+
+batches = __import__('1-batch_processing')
+
+
+def print_loop(path, batch_size):
+    """The process_and_print baseline, with stdout sent to `path`."""
+    start = time.perf_counter()
+    with open(path, "w", encoding="utf-8") as out, contextlib.redirect_stdout(out):
+        batches.process_and_print(batch_size)
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    batch_size = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    over_25 = [("age", ">", 25)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        baseline_path = os.path.join(directory, "print.ndjson")
+        baseline = print_loop(baseline_path, batch_size)
+        with open(baseline_path, encoding="utf-8") as file:
+            rows = sum(1 for _ in file)
+        print(f"print loop (batch {batch_size}): {rows} rows in {baseline:.2f} s, "
+              f"{rows / baseline:,.0f} rows/s")
+
+        for format, compression in (("ndjson", None), ("ndjson", "gzip"),
+                                    ("csv", None), ("csv", "gzip"),
+                                    ("columnar", None), ("ndjson", "zstd")):
+            if compression == "zstd" and export.zstandard is None:
+                continue
+            path = os.path.join(directory, f"users.{format}")
+            stats = export.export_users(path, format, compression, filters=over_25)
+            print(f"{format:>8} {compression or 'plain':>5}: {stats['rows']} rows, "
+                  f"{stats['bytes']:,} bytes, {stats['rows_per_sec']:,.0f} rows/s "
+                  f"({baseline / stats['seconds']:.1f}x)")
@@ -0,0 +1,80 @@
+import csv
+import os
+import random
+import sys
+import time
+
+import seed
+
+FIRST_NAMES = ("Johnnie", "Myrtle", "Glenda", "Daniel", "Ronnie", "Alma",
+               "Molly", "Delia", "Sandra", "Shelly", "Ross", "Edmund")
+LAST_NAMES = ("Mayer", "Waters", "Wisozk", "Fahey", "Bechtelar", "Altenwerth",
+              "Lesch", "Balistreri", "Reynolds", "Funk")
+DOMAINS = ("gmail.com", "yahoo.com", "hotmail.com")
+
+
+def generate_user_csv(path, rows, seed_value=0):
+    """
+    Writes a synthetic user CSV in the same shape as user_data.csv.
+
+    Args:
+        path (str): Where to write the file.
+        rows (int): Number of user records (header excluded).
+        seed_value (int): Seed for the random generator, for repeatable files.
+    """
+    rng = random.Random(seed_value)
+    with open(path, mode='w', encoding='utf-8', newline='') as file:
+        writer = csv.writer(file, quoting=csv.QUOTE_ALL, lineterminator='\n')
+        writer.writerow(("name", "email", "age"))
+        for i in range(rows):
+            first = rng.choice(FIRST_NAMES)
+            last = rng.choice(LAST_NAMES)
+            email = f"{first}.{last}{i}@{rng.choice(DOMAINS)}"
+            writer.writerow((f"{first} {last}", email, rng.randint(1, 120)))
+
+
+def truncate_users(connection):
+    cursor = connection.cursor()
+    try:
+        cursor.execute("TRUNCATE TABLE user_data")
+    finally:
+        cursor.close()
+
+
+def time_mode(connection, data_file, mode, workers=None):
+    """Empties user_data, loads data_file with the given mode and times it."""
+    truncate_users(connection)
+    start = time.perf_counter()
+    rows = seed.insert_data(connection, data_file, mode=mode, workers=workers)
+    return rows, time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    data_file = f"bench_users_{rows}.csv"
+    if not os.path.exists(data_file):
+        generate_user_csv(data_file, rows)
+
+    connection = seed.connect_to_prodev()
+    if not connection:
+        sys.exit(1)
+    seed.create_table(connection)
+
+    results = {}
+    for mode in ("atomic", "chunked", "bulk"):
+        loaded, elapsed = time_mode(connection, data_file, mode)
+        results[mode] = loaded / elapsed if elapsed else 0.0
+
+    # Parallel ingest should scale with workers until the server saturates.
+    workers = 1
+    while workers <= (os.cpu_count() or 1):
+        loaded, elapsed = time_mode(connection, data_file, "parallel", workers)
+        results[f"parallel x{workers}"] = loaded / elapsed if elapsed else 0.0
+        workers *= 2
+
+    truncate_users(connection)
+    connection.close()
+
+    print(f"\n{rows} rows from {data_file}:")
+    for mode, rate in results.items():
+        print(f"  {mode:>12}: {rate:>12,.0f} rows/s")
@@ -0,0 +1,47 @@
+import statistics
+import sys
+import time
+
+paginate = __import__('2-lazy_paginate')
+
+
+def page_latencies(page_size, keyset):
+    """
+    Walks the whole user_data table and times every page fetch.
+
+    Args:
+        page_size (int): The number of users per page.
+        keyset (bool): Use seek pagination instead of LIMIT/OFFSET.
+
+    Returns:
+        list: The wall time in seconds of each page, in page order.
+    """
+    latencies = []
+    pages = paginate.lazy_pagination(page_size, keyset=keyset)
+    while True:
+        start = time.perf_counter()
+        page = next(pages, None)
+        if page is None:
+            break
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def report(label, latencies):
+    """Prints first/median/last page latency and the total walk time."""
+    if not latencies:
+        print(f"{label}: no pages (is user_data seeded?)")
+        return
+    tenth = max(1, len(latencies) // 10)
+    print(
+        f"{label}: {len(latencies)} pages, "
+        f"first 10% avg {statistics.mean(latencies[:tenth]) * 1000:.2f} ms, "
+        f"last 10% avg {statistics.mean(latencies[-tenth:]) * 1000:.2f} ms, "
+        f"total {sum(latencies):.2f} s"
+    )
+
+
+if __name__ == '__main__':
+    page_size = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    report("offset", page_latencies(page_size, keyset=False))
+    report("keyset", page_latencies(page_size, keyset=True))
@@ -0,0 +1,32 @@
+import sys
+import time
+
+import partitioned_scan
+
+stream_ages = __import__('4-stream_ages')
+
+
+def single_stream_average():
+    total = count = 0
+    for age in stream_ages.stream_user_ages():
+        total += age
+        count += 1
+    return total / count if count else 0.0
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    levels = [int(arg) for arg in sys.argv[1:]] or [1, 2, 4, 8]
+
+    result, elapsed = timed(single_stream_average)
+    print(f"single stream_user_ages scan: {elapsed:.3f} s (avg {result:.2f})")
+
+    for executor in ("thread", "process"):
+        for partitions in levels:
+            result, elapsed = timed(partitioned_scan.average_age, partitions, executor)
+            print(f"{executor:>7} x{partitions:<2}: {elapsed:.3f} s (avg {result:.2f})")
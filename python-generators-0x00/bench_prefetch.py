@@ -0,0 +1,37 @@
+import sys
+import time
+
+batches = __import__('1-batch_processing')
+
+
+def busy(seconds):
+    """Burns CPU for roughly `seconds`, standing in for real batch work."""
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def run(batch_size, work_per_batch, prefetch):
+    """Times a full scan where every batch costs `work_per_batch` of CPU."""
+    start = time.perf_counter()
+    fetch_time = 0.0
+    rows = 0
+    stream = batches.stream_users_in_batches(batch_size, prefetch=prefetch)
+    while True:
+        fetch_start = time.perf_counter()
+        batch = next(stream, None)
+        fetch_time += time.perf_counter() - fetch_start
+        if batch is None:
+            break
+        rows += len(batch)
+        busy(work_per_batch)
+    return rows, time.perf_counter() - start, fetch_time
+
+
+if __name__ == '__main__':
+    batch_size = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    work = float(sys.argv[2]) if len(sys.argv) > 2 else 0.005
+    for prefetch in (0, 1, 4):
+        rows, total, waited = run(batch_size, work, prefetch)
+        print(f"prefetch={prefetch}: {rows} rows in {total:.3f} s, "
+              f"consumer waited {waited:.3f} s for batches")
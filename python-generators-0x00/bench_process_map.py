@@ -0,0 +1,56 @@
+import hashlib
+import multiprocessing
+import sys
+import time
+
+from pipeline import process_map
+
+batches = __import__('1-batch_processing')
+
+# Hash rounds per user; raise it to make the transform heavier.
+ROUNDS = 2000
+
+
+def score_user(user):
+    """A CPU-bound stand-in for a real per-user transform."""
+    digest = user['email'].strip().lower().encode('utf-8')
+    for _ in range(ROUNDS):
+        digest = hashlib.sha256(digest).digest()
+    return user['user_id'], digest[0] * user['age']
+
+
+def in_process(batch_size):
+    results = 0
+    for batch in batches.stream_users_in_batches(batch_size):
+        results += len([score_user(user) for user in batch])
+    return results
+
+
+def with_workers(batch_size, workers, ordered):
+    results = 0
+    stream = batches.stream_users_in_batches(batch_size)
+    for scored in process_map(stream, score_user, workers=workers, ordered=ordered):
+        results += len(scored)
+    return results
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    batch_size = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    cores = multiprocessing.cpu_count()
+
+    rows, baseline = timed(in_process, batch_size)
+    print(f"in process      : {rows} rows in {baseline:.2f} s")
+
+    workers = 1
+    while workers <= cores:
+        for ordered in (True, False):
+            rows, elapsed = timed(with_workers, batch_size, workers, ordered)
+            print(f"{workers} worker(s), {'ordered  ' if ordered else 'unordered'}: "
+                  f"{rows} rows in {elapsed:.2f} s, {baseline / elapsed:.2f}x")
+        workers *= 2
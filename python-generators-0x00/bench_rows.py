@@ -0,0 +1,48 @@
+import sys
+import time
+import tracemalloc
+
+from rows import BATCH_FORMATS, ROW_FORMATS
+
+stream_users = __import__('0-stream_users')
+batches = __import__('1-batch_processing')
+
+
+def retained_bytes(make_rows):
+    """Bytes allocated by materialising everything make_rows() yields."""
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        kept = list(make_rows())
+        after, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return kept, after - before, peak - before
+
+
+def rows_per_second(scan, count):
+    start = time.perf_counter()
+    rows = sum(count(item) for item in scan())
+    return rows, rows / (time.perf_counter() - start)
+
+
+if __name__ == '__main__':
+    batch_size = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+
+    print("stream_users (one row at a time):")
+    for row_format in ROW_FORMATS:
+        scan = lambda: stream_users.stream_users(row_format)
+        kept, retained, peak = retained_bytes(scan)
+        rows, rate = rows_per_second(scan, lambda row: 1)
+        print(f"  {row_format:>10}: {rate:>12,.0f} rows/s  "
+              f"{retained / max(len(kept), 1):7.1f} B/row retained  "
+              f"peak {peak / 1e6:7.2f} MB")
+
+    print(f"stream_users_in_batches (batch_size={batch_size}):")
+    for row_format in BATCH_FORMATS:
+        scan = lambda: batches.stream_users_in_batches(batch_size, row_format=row_format)
+        kept, retained, peak = retained_bytes(scan)
+        rows, rate = rows_per_second(scan, len)
+        print(f"  {row_format:>10}: {rate:>12,.0f} rows/s  "
+              f"{retained / max(rows, 1):7.1f} B/row retained  "
+              f"peak {peak / 1e6:7.2f} MB")
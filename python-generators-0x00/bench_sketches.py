@@ -0,0 +1,87 @@
+import random
+import sys
+from bisect import bisect_left, bisect_right
+
+from sketches import FixedHistogram, HyperLogLog, KLLSketch
+
+PERCENTILES = (50, 95, 99)
+
+
+def check_quantiles(values, k=200, partitions=4, tolerance=0.02):
+    """
+    Sketches `values` in several partitions, merges them, and compares the
+    merged percentiles with the exact ones by rank error.
+
+    Returns:
+        float: The worst rank error seen.
+    """
+    sketches = [KLLSketch(k, seed=i) for i in range(partitions)]
+    for i, value in enumerate(values):
+        sketches[i % partitions].update(value)
+    merged = sketches[0]
+    for other in sketches[1:]:
+        merged.merge(other)
+
+    ordered = sorted(values)
+    worst = 0.0
+    for p, estimate in merged.percentiles(PERCENTILES).items():
+        # Ties make a single rank ambiguous; accept any rank the value spans.
+        lower = bisect_left(ordered, estimate) / len(ordered)
+        upper = bisect_right(ordered, estimate) / len(ordered)
+        target = p / 100
+        if lower <= target <= upper:
+            error = 0.0
+        else:
+            error = min(abs(target - lower), abs(target - upper))
+        worst = max(worst, error)
+        print(f"  p{p}: sketch {estimate}  rank error {error:.4f}")
+    assert worst <= tolerance, f"rank error {worst:.4f} exceeds {tolerance}"
+    print(f"  retained {merged.size} of {merged.n} values")
+    return worst
+
+
+def check_histogram(values):
+    histogram = FixedHistogram(0, 130, 10)
+    halves = FixedHistogram(0, 130, 10), FixedHistogram(0, 130, 10)
+    for i, value in enumerate(values):
+        histogram.update(value)
+        halves[i % 2].update(value)
+    exact = {}
+    for value in values:
+        exact[value // 10 * 10] = exact.get(value // 10 * 10, 0) + 1
+    assert histogram.buckets() == exact
+    assert halves[0].merge(halves[1]).buckets() == exact
+    print("  histogram buckets match exactly")
+
+
+def check_distinct(distinct, precision=12):
+    parts = [HyperLogLog(precision) for _ in range(4)]
+    for i in range(distinct):
+        parts[i % 4].update(f"domain{i}.example")
+        parts[(i + 1) % 4].update(f"domain{i}.example")  # overlapping partitions
+    merged = parts[0]
+    for other in parts[1:]:
+        merged.merge(other)
+    error = abs(merged.count() - distinct) / distinct
+    bound = 3 * 1.04 / (2 ** precision) ** 0.5
+    print(f"  distinct {distinct}: estimate {merged.count()}  error {error:.4f}")
+    assert error <= bound, f"HLL error {error:.4f} exceeds 3 sigma ({bound:.4f})"
+
+
+if __name__ == '__main__':
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    rng = random.Random(1)
+
+    print(f"KLL over {rows} integer ages:")
+    ages = [rng.randint(1, 120) for _ in range(rows)]
+    check_quantiles(ages)
+
+    print(f"KLL over {rows} continuous values:")
+    check_quantiles([rng.lognormvariate(3, 1) for _ in range(rows)])
+
+    print("Fixed histogram:")
+    check_histogram(ages)
+
+    print("HyperLogLog:")
+    for distinct in (100, 10_000, 200_000):
+        check_distinct(distinct)
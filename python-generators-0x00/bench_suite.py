@@ -0,0 +1,221 @@
+"""
+Memory and throughput benchmarks for the streaming generators.
+
+For every scale, user_data is seeded from a synthetic CSV and each workload
+runs in a fresh child process, so its peak RSS is its own:
+
+    python3 bench_suite.py --scales 10000,1000000 --output results.json
+    python3 bench_suite.py --backend mysql --compare results.json
+
+Recorded per workload and scale: rows, seconds, rows/sec, time to first
+row, peak RSS of the child process and the tracemalloc peak of a second,
+traced pass (tracing slows Python down, so it is not timed).
+
+--backend sqlite (the default) runs against a separate SQLite file through
+the SQLite storage backend and needs no server. --backend mysql empties and
+reseeds the real user_data table.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import seed
+from bench_ingest import generate_user_csv, truncate_users
+
+DEFAULT_SCALES = (10_000,)
+SQLITE_BENCH_PATH = "bench_suite.sqlite3"
+BATCH_SIZE = 1000
+PAGE_SIZE = 1000
+
+
+def _count_rows(iterable):
+    """Consumes a row generator: (rows, seconds to the first row)."""
+    started = time.perf_counter()
+    first = None
+    rows = 0
+    for _ in iterable:
+        if first is None:
+            first = time.perf_counter() - started
+        rows += 1
+    return rows, first
+
+
+def _count_batches(iterable):
+    """Consumes a batch generator: (rows, seconds to the first batch)."""
+    started = time.perf_counter()
+    first = None
+    rows = 0
+    for batch in iterable:
+        if first is None:
+            first = time.perf_counter() - started
+        rows += len(batch)
+    return rows, first
+
+
+def _average_age():
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        __import__('4-stream_ages').calculate_average_age()
+    # One result: the first "row" is the answer itself.
+    return None, time.perf_counter() - started
+
+
+WORKLOADS = {
+    "stream_users": lambda: _count_rows(
+        __import__('0-stream_users').stream_users()),
+    "stream_users_in_batches": lambda: _count_batches(
+        __import__('1-batch_processing').stream_users_in_batches(BATCH_SIZE)),
+    "lazy_pagination": lambda: _count_batches(
+        __import__('2-lazy_paginate').lazy_pagination(PAGE_SIZE)),
+    "calculate_average_age": _average_age,
+}
+
+
+def _peak_rss_kb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux but in bytes on macOS.
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def use_backend(backend, sqlite_path=SQLITE_BENCH_PATH):
+    """Points the generators at the benchmark database."""
+    seed.use_backend(backend, sqlite_path if backend == "sqlite" else None)
+
+
+def run_workload(name, scale):
+    """Runs one workload in this process and returns its measurements."""
+    workload = WORKLOADS[name]
+    started = time.perf_counter()
+    rows, first_row = workload()
+    seconds = time.perf_counter() - started
+    rows = scale if rows is None else rows
+    peak_rss = _peak_rss_kb()
+
+    tracemalloc.start()
+    workload()
+    _, traced_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "workload": name,
+        "scale": scale,
+        "rows": rows,
+        "seconds": seconds,
+        "rows_per_sec": rows / seconds if seconds else 0.0,
+        "time_to_first_row": first_row,
+        "peak_rss_kb": peak_rss,
+        "tracemalloc_peak_bytes": traced_peak,
+    }
+
+
+def seed_scale(backend, scale, sqlite_path=SQLITE_BENCH_PATH):
+    """Loads `scale` synthetic users into an emptied user_data table."""
+    data_file = f"bench_users_{scale}.csv"
+    if not os.path.exists(data_file):
+        generate_user_csv(data_file, scale)
+
+    if backend == "sqlite":
+        for path in (sqlite_path, f"{sqlite_path}-wal", f"{sqlite_path}-shm"):
+            if os.path.exists(path):
+                os.remove(path)
+        mode = "chunked"
+    else:
+        mode = "bulk"
+    use_backend(backend, sqlite_path)
+    connection = seed.connect_to_prodev()
+    if not connection:
+        raise SystemExit("Could not connect to the benchmark database")
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            seed.create_table(connection)
+            if backend != "sqlite":
+                truncate_users(connection)
+            loaded = seed.insert_data(connection, data_file, chunk_size=10_000,
+                                      mode=mode, checkpoint=False)
+    finally:
+        connection.close()
+    if loaded != scale:
+        raise SystemExit(f"Seeded {loaded} of {scale} rows")
+
+
+def _run_child(backend, name, scale):
+    """Runs one workload in a fresh interpreter and returns its result."""
+    output = subprocess.run(
+        [sys.executable, __file__, "--child", name, "--backend", backend,
+         "--scales", str(scale)],
+        check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def compare(results, baseline_path):
+    """Prints the change of every metric against an earlier results file."""
+    with open(baseline_path, encoding="utf-8") as file:
+        baseline = {(r["workload"], r["scale"]): r for r in json.load(file)["results"]}
+    print(f"\nChange against {baseline_path}:")
+    for result in results:
+        before = baseline.get((result["workload"], result["scale"]))
+        if before is None:
+            continue
+        changes = []
+        for metric in ("rows_per_sec", "peak_rss_kb", "tracemalloc_peak_bytes"):
+            if before[metric]:
+                change = (result[metric] - before[metric]) / before[metric]
+                changes.append(f"{metric} {change:+.1%}")
+        print(f"  {result['workload']:<24}{result['scale']:>10}: {', '.join(changes)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--scales", default=",".join(map(str, DEFAULT_SCALES)),
+                        help="comma-separated row counts, e.g. 10000,1000000,10000000")
+    parser.add_argument("--backend", choices=("sqlite", "mysql"), default="sqlite")
+    parser.add_argument("--workloads", default=",".join(WORKLOADS))
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--compare", help="earlier results file to diff against")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    scales = [int(scale) for scale in args.scales.split(",")]
+
+    if args.child:
+        use_backend(args.backend)
+        print(json.dumps(run_workload(args.child, scales[0])))
+        return
+
+    results = []
+    for scale in scales:
+        print(f"Seeding {scale:,} rows ({args.backend})...")
+        seed_scale(args.backend, scale)
+        for name in args.workloads.split(","):
+            result = _run_child(args.backend, name, scale)
+            results.append(result)
+            first = result["time_to_first_row"]
+            print(f"  {name:<24}{result['rows_per_sec']:>12,.0f} rows/s  "
+                  f"first row {first * 1000 if first is not None else float('nan'):8.1f} ms  "
+                  f"RSS {result['peak_rss_kb'] / 1024:7.1f} MiB  "
+                  f"traced {result['tracemalloc_peak_bytes'] / 1024:9.1f} KiB")
+
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump({
+            "backend": args.backend,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "results": results,
+        }, file, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,205 @@
+"""
+JSON encoders for streamed rows.
+
+get_encoder() returns a RowEncoder that turns one row into a JSON string
+(row) or a batch of rows into NDJSON bytes (batch). Three implementations:
+
+    "stdlib"    json.JSONEncoder, plus the value types below
+    "compiled"  a function generated once per column list that writes the
+                fixed object shape directly, with the C string escaper from
+                the json module. Its output is identical to json.dumps(row)
+                for dict rows whose keys are those columns, in that order.
+    "orjson"    orjson (pip install orjson), the fastest, but compact: no
+                spaces after ':' and ','.
+    "auto"      orjson when installed, "compiled" otherwise.
+
+All of them also accept UUID (as its string), Decimal (as a JSON int, or a
+float when it has a fraction), datetime/date (ISO 8601 string) and bytes
+(UTF-8) values, which json.dumps rejects; orjson writes Decimal as a string.
+"""
+import datetime
+import json
+import uuid
+from decimal import Decimal
+from json.encoder import encode_basestring_ascii
+
+from predicates import USER_COLUMNS
+from rows import INTEGER_COLUMNS
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; the compiled encoder is the fallback
+    orjson = None
+
+ENCODERS = ("auto", "stdlib", "compiled", "orjson")
+
+
+def _default(value):
+    """json `default` hook for the types the stdlib encoder rejects."""
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    if isinstance(value, bytes):
+        return value.decode('utf-8')
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+_stdlib_encode = json.JSONEncoder(default=_default).encode
+
+
+class RowEncoder:
+    """
+    Encodes rows of a fixed column list.
+
+    Attributes:
+        row (callable): row -> str, one JSON object.
+        batch (callable): list of rows -> bytes, NDJSON with a trailing newline.
+    """
+
+    def __init__(self, name, row, batch):
+        self.name = name
+        self.row = row
+        self.batch = batch
+
+    def __repr__(self):
+        return f"RowEncoder({self.name!r})"
+
+
+def _ndjson(encode_row):
+    def encode_batch(rows):
+        return ("\n".join([encode_row(row) for row in rows]) + "\n").encode('utf-8')
+    return encode_batch
+
+
+def _stdlib(names, row_type):
+    if row_type == "dict":
+        return RowEncoder("stdlib", _stdlib_encode, _ndjson(_stdlib_encode))
+    encode_row = lambda row: _stdlib_encode(dict(zip(names, row)))
+    return RowEncoder("stdlib", encode_row, _ndjson(encode_row))
+
+
+def _orjson(names, row_type):
+    if orjson is None:
+        raise ImportError("The orjson encoder needs the orjson package")
+    dumps = orjson.dumps
+    if row_type == "dict":
+        to_bytes = lambda row: dumps(row, default=_orjson_default)
+    else:
+        to_bytes = lambda row: dumps(dict(zip(names, row)), default=_orjson_default)
+
+    def encode_batch(rows):
+        return b"\n".join([to_bytes(row) for row in rows]) + b"\n"
+    return RowEncoder("orjson", lambda row: to_bytes(row).decode('utf-8'), encode_batch)
+
+
+def _orjson_default(value):
+    """orjson handles UUID and datetime itself; these are the rest."""
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, bytes):
+        return value.decode('utf-8')
+    raise TypeError
+
+
+def compile_row_encoder(names=USER_COLUMNS, row_type="dict"):
+    """
+    Generates an encoder function for rows with exactly these columns.
+
+    The JSON text of the keys is built into the function once. Per row,
+    strings go through the C escaper, UUIDs through it as their string and
+    ints through int.__repr__ (what json.dumps and _default do for them). A
+    row of a different length, a dict row missing one of the columns, or
+    any other value type, such as None or a Decimal, makes that row fall
+    back to the stdlib encoder, so the result never differs from it. (Dict keys are written in `names`
+    order; json.dumps follows the dict's own order.)
+
+    Args:
+        names (tuple): Column names, in output order.
+        row_type (str): "dict" rows (looked up by name) or "tuple" rows
+            (any sequence in `names` order, e.g. namedtuples).
+
+    Returns:
+        callable: row -> str.
+    """
+    if row_type not in ("dict", "tuple"):
+        raise ValueError(f"Unknown row type {row_type!r}")
+    names = tuple(names)
+    # One f-string per row; the expressions only index _names, so the
+    # template needs no quoting beyond repr().
+    template = ""
+    for i, name in enumerate(names):
+        key = encode_basestring_ascii(name).replace("{", "{{").replace("}", "}}")
+        access = f"row[_names[{i}]]" if row_type == "dict" else f"row[{i}]"
+        if name in INTEGER_COLUMNS:
+            value = f"_int({access})"
+        else:
+            # str, the common case, stays a direct call of the C escaper.
+            value = f"_str(v) if (v := {access}).__class__ is str else _text(v)"
+        template += ("{{" if i == 0 else ", ") + key + ": {" + value + "}"
+    body = "f" + repr(template + "}}") if names else "'{}'"
+    fallback = "_stdlib_encode(row)" if row_type == "dict" else \
+        "_stdlib_encode(dict(zip(_names, row)))"
+    source = (
+        "def encode(row):\n"
+        "    if len(row) != _count:\n"
+        f"        return {fallback}\n"
+        "    try:\n"
+        f"        return {body}\n"
+        "    except (TypeError, KeyError):\n"
+        f"        return {fallback}\n"
+    )
+    namespace = {
+        "_str": encode_basestring_ascii,
+        "_int": _exact_int,
+        "_text": _text,
+        "_stdlib_encode": _stdlib_encode,
+        "_names": names,
+        "_count": len(names),
+    }
+    exec(source, namespace)
+    return namespace["encode"]
+
+
+def _text(value):
+    # A UUID user_id, as the mysql.connector converters may return it.
+    if value.__class__ is not uuid.UUID:
+        raise TypeError
+    return encode_basestring_ascii(str(value))
+
+
+def _exact_int(value):
+    # bool is an int but json writes true/false; leave it to the fallback.
+    if value.__class__ is not int:
+        raise TypeError
+    return int.__repr__(value)
+
+
+def _compiled(names, row_type):
+    encode_row = compile_row_encoder(names, row_type)
+    return RowEncoder("compiled", encode_row, _ndjson(encode_row))
+
+
+def get_encoder(name="auto", names=USER_COLUMNS, row_type="dict"):
+    """
+    Returns a RowEncoder.
+
+    Args:
+        name (str): One of ENCODERS.
+        names (tuple): Columns of the rows, in order.
+        row_type (str): "dict" or "tuple" rows.
+
+    Raises:
+        ImportError: For "orjson" when orjson is not installed.
+    """
+    if name not in ENCODERS:
+        raise ValueError(f"Unknown encoder {name!r}; expected one of {', '.join(ENCODERS)}")
+    if name == "auto":
+        name = "orjson" if orjson is not None else "compiled"
+    if name == "stdlib":
+        return _stdlib(names, row_type)
+    if name == "orjson":
+        return _orjson(names, row_type)
+    return _compiled(names, row_type)
@@ -0,0 +1,224 @@
+"""
+Streaming export of user_data to NDJSON, CSV or columnar binary files.
+
+Rows are read with stream_users_in_batches and every batch is encoded into
+one bytes chunk and written with a single call to a large buffered
+(optionally gzip or zstd compressed) file, instead of one print() per row:
+
+    stats = export_users("users-{part:03d}.ndjson.gz", format="ndjson",
+                         compression="gzip", max_bytes=256 * 1024 * 1024)
+
+Formats:
+
+    "ndjson"    one JSON object per line, as json.dumps(user) prints it
+                (see encoders.py for faster, compact encoders)
+    "csv"       header line, then one row per line
+    "columnar"  the snapshot_cache file layout: typed column buffers per
+                batch plus a JSON footer. Uncompressed files can be read
+                back zero-copy with snapshot_cache.read_snapshot.
+
+With max_bytes set, a new file is started once the current one reaches
+that many bytes on disk (checked after each batch), and the path must
+contain a "{part}" field to number the files.
+"""
+import csv
+import gzip
+import io
+import os
+import sys
+import time
+
+from encoders import get_encoder
+from predicates import compile_projection
+from snapshot_cache import SnapshotWriter
+
+try:
+    import zstandard
+except ImportError:  # zstd output is optional; pip install zstandard
+    zstandard = None
+
+stream_batches = __import__('1-batch_processing')
+
+EXPORT_FORMATS = ("ndjson", "csv", "columnar")
+COMPRESSIONS = (None, "gzip", "zstd")
+EXPORT_BATCH_SIZE = 10000
+WRITE_BUFFER_SIZE = 1024 * 1024
+# Fast levels: export throughput matters more here than the last few percent.
+GZIP_LEVEL = 1
+ZSTD_LEVEL = 3
+
+# Stream format each export format is encoded from.
+_ROW_FORMATS = {"ndjson": "dict", "csv": "tuple", "columnar": "columns"}
+
+
+def open_output(path, compression=None):
+    """
+    Opens `path` for binary writing with a large buffer and compression.
+
+    Returns:
+        tuple: (stream, raw) where batches are written to `stream` and
+        raw.tell() is the number of bytes on disk so far. Close `stream`
+        first, then `raw`.
+    """
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"Unknown compression {compression!r}")
+    raw = open(path, "wb", buffering=WRITE_BUFFER_SIZE)
+    if compression == "gzip":
+        return gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=GZIP_LEVEL), raw
+    if compression == "zstd":
+        if zstandard is None:
+            raw.close()
+            raise ImportError("zstd compression needs the zstandard package")
+        compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL)
+        return compressor.stream_writer(raw, closefd=False), raw
+    return raw, raw
+
+
+class _NDJSONEncoder:
+    def __init__(self, names, encoder="compiled"):
+        self.encode = get_encoder(encoder, names).batch
+
+    def header(self):
+        return b""
+
+
+class _CSVEncoder:
+    def __init__(self, names, encoder=None):
+        self.names = names
+
+    def _lines(self, rows):
+        buffer = io.StringIO()
+        csv.writer(buffer, lineterminator="\n").writerows(rows)
+        return buffer.getvalue().encode("utf-8")
+
+    def header(self):
+        return self._lines([self.names])
+
+    def encode(self, batch):
+        return self._lines(batch)
+
+
+class _Output:
+    """One export file: the open streams plus the format's writer state."""
+
+    def __init__(self, path, format, compression, names, encoder):
+        self.path = path
+        self.stream, self.raw = open_output(path, compression)
+        self.rows = 0
+        self.uncompressed = 0
+        if format == "columnar":
+            self.columnar = SnapshotWriter(self.stream, names)
+            self.encoder = None
+            self.uncompressed = self.columnar.position
+        else:
+            self.columnar = None
+            self.encoder = (_NDJSONEncoder if format == "ndjson" else _CSVEncoder)(names, encoder)
+            self._write(self.encoder.header())
+
+    def _write(self, chunk):
+        self.stream.write(chunk)
+        self.uncompressed += len(chunk)
+
+    def write(self, batch):
+        if self.columnar is not None:
+            before = self.columnar.position
+            self.columnar.write(batch)
+            self.uncompressed += self.columnar.position - before
+        else:
+            self._write(self.encoder.encode(batch))
+        self.rows += len(batch)
+
+    @property
+    def size(self):
+        return self.raw.tell()
+
+    def close(self):
+        if self.columnar is not None:
+            before = self.columnar.position
+            self.columnar.finish()
+            self.uncompressed += self.columnar.position - before
+        if self.stream is not self.raw:
+            self.stream.close()
+        self.raw.close()
+        return {"path": self.path, "rows": self.rows,
+                "bytes": os.path.getsize(self.path),
+                "uncompressed_bytes": self.uncompressed}
+
+
+def export_users(path, format="ndjson", compression=None, batch_size=EXPORT_BATCH_SIZE,
+                 max_bytes=None, filters=None, columns=None, prefetch=1,
+                 encoder="compiled"):
+    """
+    Exports user_data to one or more files.
+
+    Args:
+        path (str): Output file. Must contain "{part}" (e.g.
+            "users-{part:03d}.csv") when max_bytes is set.
+        format (str): One of EXPORT_FORMATS.
+        compression (str): None, "gzip" or "zstd".
+        batch_size (int): Rows per fetch and per write.
+        max_bytes (int): Rotate to a new file after this many bytes on disk.
+        filters (list): Filter specs, as for stream_users_in_batches.
+        columns (iterable): Columns to export; all of them when None.
+        prefetch (int): Batches fetched ahead while the previous one is
+            encoded and written.
+        encoder (str): NDJSON encoder, see encoders.py. The default
+            "compiled" writes exactly what json.dumps would; "orjson" is
+            faster but compact.
+
+    Returns:
+        dict: rows, bytes (on disk), uncompressed_bytes, files (per-file
+        stats), seconds, rows_per_sec and bytes_per_sec.
+    """
+    if format not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format {format!r}; "
+                         f"expected one of {', '.join(EXPORT_FORMATS)}")
+    if max_bytes and "{part" not in path:
+        raise ValueError("A rotating export needs a {part} field in the path")
+    names = compile_projection(columns)
+
+    started = time.perf_counter()
+    files = []
+    output = None
+    try:
+        for batch in stream_batches.stream_users_in_batches(
+                batch_size, filters, names, prefetch, _ROW_FORMATS[format]):
+            if output is None:
+                output = _Output(path.format(part=len(files) + 1), format,
+                                 compression, names, encoder)
+            output.write(batch)
+            if max_bytes and output.size >= max_bytes:
+                files.append(output.close())
+                output = None
+    finally:
+        if output is not None:
+            files.append(output.close())
+    seconds = time.perf_counter() - started
+
+    rows = sum(file["rows"] for file in files)
+    size = sum(file["bytes"] for file in files)
+    return {
+        "rows": rows,
+        "bytes": size,
+        "uncompressed_bytes": sum(file["uncompressed_bytes"] for file in files),
+        "files": files,
+        "seconds": seconds,
+        "rows_per_sec": rows / seconds if seconds else 0.0,
+        "bytes_per_sec": size / seconds if seconds else 0.0,
+    }
+
+
+def print_stats(stats):
+    """Prints the summary returned by export_users."""
+    print(f"Exported {stats['rows']} rows to {len(stats['files'])} file(s), "
+          f"{stats['bytes']} bytes ({stats['uncompressed_bytes']} uncompressed) "
+          f"in {stats['seconds']:.2f} s: {stats['rows_per_sec']:,.0f} rows/s, "
+          f"{stats['bytes_per_sec'] / 1e6:,.1f} MB/s")
+
+
+if __name__ == '__main__':
+    # python3 export.py <path> [ndjson|csv|columnar] [gzip|zstd]
+    out_path = sys.argv[1] if len(sys.argv) > 1 else "users.ndjson"
+    out_format = sys.argv[2] if len(sys.argv) > 2 else "ndjson"
+    out_compression = sys.argv[3] if len(sys.argv) > 3 else None
+    print_stats(export_users(out_path, out_format, out_compression))
@@ -0,0 +1,273 @@
+"""
+Incremental (change-data) streaming of user_data.
+
+With change tracking enabled (seed.add_change_tracking) every insert and
+update stamps the row's updated_at. A high-water mark - the (updated_at,
+user_id) of the last row handed out - is kept in a small JSON state file, so
+each run yields only the rows changed since the previous one:
+
+    for user in stream_changed_users(state_file="reports.hwm"):
+        ...
+
+tail_users keeps polling for changes instead of stopping, backing off while
+the table is idle. Delivery is at-least-once: the mark is saved only after
+the consumer has taken a whole batch, so a crash repeats at most one batch.
+Deleted rows are not reported.
+
+updated_at is stamped when a statement runs, not when its transaction
+commits, so a poll never reads past the start of the oldest transaction
+still open on the server (INNODB_TRX, which needs the PROCESS privilege).
+Without that privilege only the SETTLE_SECONDS window protects in-flight
+writes: rows of a longer transaction, such as seed.insert_data in "atomic"
+or "bulk" mode, are then skipped once they commit, so load with the default
+"chunked" mode while anything tails the table. Change tracking, and so this module, needs
+the MySQL backend.
+"""
+import json
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+
+from seed import CHANGE_COLUMN, DatabaseError, pooled_connection
+
+CHANGE_BATCH_SIZE = 1000
+
+# Rows stamped less than this long ago (by the server clock) are left for
+# the next poll: a transaction still in flight may yet commit rows with an
+# updated_at just below them, which a mark past them would skip.
+SETTLE_SECONDS = 1.0
+
+# Start of the oldest other transaction that may have written rows. Its
+# rows are stamped no earlier, so the poll cutoff stays below it until it
+# ends. Autocommit SELECTs cannot write and are left out, or every running
+# stream would hold the tail back. trx_started has whole seconds only,
+# which errs on the early side.
+OLDEST_TRANSACTION_QUERY = (
+    "SELECT MIN(trx_started) AS started FROM information_schema.INNODB_TRX "
+    "WHERE trx_mysql_thread_id <> CONNECTION_ID() "
+    "AND trx_is_autocommit_non_locking = 0"
+)
+
+TAIL_MIN_INTERVAL = 0.5
+TAIL_MAX_INTERVAL = 30.0
+TAIL_BACKOFF = 2.0
+
+_START = (datetime(1970, 1, 1), "")
+
+CHANGES_QUERY = (
+    f"SELECT user_id, name, email, age, {CHANGE_COLUMN} FROM user_data "
+    # Written out rather than as a row constructor so MySQL can range-scan
+    # the (updated_at, user_id) index.
+    f"WHERE ({CHANGE_COLUMN} > %s OR ({CHANGE_COLUMN} = %s AND user_id > %s)) "
+    f"AND {CHANGE_COLUMN} <= %s "
+    f"ORDER BY {CHANGE_COLUMN}, user_id LIMIT %s"
+)
+
+
+def load_mark(state_file):
+    """
+    Reads a high-water mark saved by save_mark.
+
+    Returns:
+        tuple: (updated_at, user_id) of the last row delivered, or None if
+        the state file does not exist yet.
+    """
+    try:
+        with open(state_file, encoding='utf-8') as file:
+            state = json.load(file)
+    except FileNotFoundError:
+        return None
+    return datetime.fromisoformat(state['updated_at']), state['user_id']
+
+
+def save_mark(state_file, mark):
+    """Atomically records the (updated_at, user_id) high-water mark."""
+    updated_at, user_id = mark
+    temp_path = f"{state_file}.tmp"
+    with open(temp_path, mode='w', encoding='utf-8') as file:
+        json.dump({'updated_at': updated_at.isoformat(), 'user_id': user_id}, file)
+    os.replace(temp_path, state_file)
+
+
+class PollMetrics:
+    """
+    Per-poll latency and row counts of an incremental stream.
+
+    A poll is one catch-up pass: the queries that drain every change up to
+    the settle cutoff. Latency covers the database round trips only, not
+    the time the consumer spends on the rows. Safe to read from another
+    thread while the stream runs.
+    """
+
+    def __init__(self, window=100):
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=window)
+        self.polls = 0
+        self.rows = 0
+        self.empty_polls = 0
+        self.last_latency = None
+        self.last_rows = None
+        self.interval = None
+
+    def record(self, latency, rows):
+        with self._lock:
+            self.polls += 1
+            self.rows += rows
+            self.empty_polls += not rows
+            self.last_latency = latency
+            self.last_rows = rows
+            self._latencies.append(latency)
+
+    def stats(self):
+        """A snapshot of the counters plus latency percentiles (seconds)."""
+        with self._lock:
+            latencies = sorted(self._latencies)
+            stats = {
+                'polls': self.polls,
+                'rows': self.rows,
+                'empty_polls': self.empty_polls,
+                'rows_per_poll': self.rows / self.polls if self.polls else 0.0,
+                'last_latency': self.last_latency,
+                'last_rows': self.last_rows,
+                'interval': self.interval,
+            }
+        for name, q in (('p50_latency', 0.5), ('p95_latency', 0.95)):
+            stats[name] = latencies[int(q * (len(latencies) - 1))] if latencies else None
+        return stats
+
+
+_transactions_unreadable = False
+
+
+def _oldest_transaction(cursor):
+    """
+    Start time of the oldest open transaction (OLDEST_TRANSACTION_QUERY),
+    or None when there is none or INNODB_TRX cannot be read.
+    """
+    global _transactions_unreadable
+    if _transactions_unreadable:
+        return None
+    try:
+        cursor.execute(OLDEST_TRANSACTION_QUERY)
+        return cursor.fetchone()['started']
+    except DatabaseError as err:
+        # Reported once: tail_users would otherwise repeat it every poll.
+        _transactions_unreadable = True
+        print(f"Cannot read open transactions ({err}); long transactions "
+              f"may be missed, see incremental.py")
+        return None
+
+
+def _poll(mark, batch_size, settle, metrics):
+    """
+    Generator over batches of rows changed after `mark`, up to the cutoff.
+
+    Each batch is a separate short keyset query, so no long-running read
+    view is held open while the consumer works.
+    """
+    started = time.perf_counter()
+    busy = 0.0
+    rows = 0
+    with pooled_connection() as connection:
+        if not connection:
+            return
+        cursor = connection.cursor(dictionary=True)
+        try:
+            cursor.execute("SELECT NOW(6) AS now")
+            cutoff = cursor.fetchone()['now'] - timedelta(seconds=settle)
+            oldest = _oldest_transaction(cursor)
+            if oldest is not None:
+                # Its rows may be stamped at exactly `oldest`; stay below.
+                cutoff = min(cutoff, oldest - timedelta(microseconds=1))
+            while True:
+                cursor.execute(CHANGES_QUERY, (mark[0], mark[0], mark[1],
+                                               cutoff, batch_size))
+                batch = cursor.fetchall()
+                busy += time.perf_counter() - started
+                if not batch:
+                    break
+                rows += len(batch)
+                mark = (batch[-1][CHANGE_COLUMN], batch[-1]['user_id'])
+                yield batch
+                started = time.perf_counter()
+        except DatabaseError as err:
+            print(f"Error polling for changes: {err}")
+        finally:
+            cursor.close()
+            if metrics is not None:
+                metrics.record(busy, rows)
+
+
+def stream_changed_users(since=None, state_file=None, batch_size=CHANGE_BATCH_SIZE,
+                         settle=SETTLE_SECONDS, metrics=None):
+    """
+    Generator that yields the users changed since the last run.
+
+    Args:
+        since (tuple): (updated_at, user_id) to start after; overrides the
+            state file. Everything is yielded when neither is set.
+        state_file (str): Where the high-water mark is loaded from and
+            saved to; nothing is persisted when None.
+        batch_size (int): Rows per query.
+        settle (float): Seconds of most recent changes to leave for the
+            next run (see SETTLE_SECONDS); changes since the start of the
+            oldest open transaction are left as well.
+        metrics (PollMetrics): Receives this run's latency and row count.
+
+    Yields:
+        dict: A changed user, including its updated_at, in (updated_at,
+        user_id) order.
+    """
+    mark = since or (state_file and load_mark(state_file)) or _START
+    for batch in _poll(mark, batch_size, settle, metrics):
+        yield from batch
+        # The consumer has taken the whole batch; only now move the mark.
+        mark = (batch[-1][CHANGE_COLUMN], batch[-1]['user_id'])
+        if state_file:
+            save_mark(state_file, mark)
+
+
+def tail_users(state_file=None, since=None, batch_size=CHANGE_BATCH_SIZE,
+               settle=SETTLE_SECONDS, min_interval=TAIL_MIN_INTERVAL,
+               max_interval=TAIL_MAX_INTERVAL, metrics=None, stop=None):
+    """
+    Generator that follows user_data changes indefinitely.
+
+    After each catch-up pass it sleeps before polling again. The pause
+    starts at min_interval and is multiplied by TAIL_BACKOFF after every
+    pass that found nothing, up to max_interval; any change resets it, so a
+    busy table is followed closely and an idle one costs few queries.
+
+    Args:
+        state_file (str): High-water mark file, as for stream_changed_users.
+        since (tuple): Starting mark; overrides the state file.
+        batch_size (int): Rows per query.
+        settle (float): See stream_changed_users.
+        min_interval (float): Seconds between polls while rows keep coming.
+        max_interval (float): Upper bound for the backoff.
+        metrics (PollMetrics): Updated after every poll, including the
+            current interval.
+        stop (threading.Event): Ends the generator when set; it is also
+            checked during the pauses, so stopping is prompt.
+
+    Yields:
+        dict: A changed user, as for stream_changed_users.
+    """
+    metrics = metrics if metrics is not None else PollMetrics()
+    stop = stop or threading.Event()
+    mark = since or (state_file and load_mark(state_file)) or _START
+    interval = min_interval
+
+    while not stop.is_set():
+        found = False
+        for user in stream_changed_users(mark, state_file, batch_size, settle, metrics):
+            found = True
+            mark = (user[CHANGE_COLUMN], user['user_id'])
+            yield user
+            if stop.is_set():
+                return
+        interval = min_interval if found else min(interval * TAIL_BACKOFF, max_interval)
+        metrics.interval = interval
+        stop.wait(interval)
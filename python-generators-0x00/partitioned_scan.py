@@ -0,0 +1,267 @@
+import multiprocessing
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import reduce
+
+from predicates import apply_residual, build_select
+from seed import (DatabaseError, close_cursor, configure_pool, get_backend,
+                  get_pool, pooled_connection)
+
+PARTITION_BATCH_SIZE = 1000
+
+# Random (v4) and row_uuid (v5) user_ids have uniformly distributed leading
+# hex digits, so cutting the 32-bit space of the first 8 digits gives even
+# partitions for them. MySQL's UUID() (bulk loads) is time-based: its
+# leading digits cluster, which is why the default ranges are sampled.
+_PREFIX_SPACE = 16 ** 8
+
+
+def uniform_ranges(partitions):
+    """
+    Splits the user_id key space into `partitions` disjoint ranges.
+
+    Only even for uniformly distributed keys (see _PREFIX_SPACE); needs no
+    query.
+
+    Returns:
+        list: (low, high) pairs; low is inclusive, high exclusive, and None
+        means unbounded. Together they cover every possible user_id.
+    """
+    cuts = [format(i * _PREFIX_SPACE // partitions, '08x')
+            for i in range(1, partitions)]
+    bounds = [None] + cuts + [None]
+    return list(zip(bounds, bounds[1:]))
+
+
+def sampled_ranges(partitions):
+    """
+    Splits user_data into ranges holding about the same number of rows.
+
+    Unlike uniform_ranges this does not assume uniformly distributed keys:
+    it reads the row count, then numbers the rows in user_id order with
+    ROW_NUMBER() and returns the user_id at every cut rank. That is one
+    pass over the primary key for all the boundaries. The default ranges
+    of partitioned_scan and map_partitions.
+
+    Window functions need MySQL 8 (or SQLite 3.25); on older servers, as
+    when no connection is available, the uniform_ranges are returned.
+    """
+    with pooled_connection() as connection:
+        if not connection:
+            return uniform_ranges(partitions)
+        cursor = connection.cursor()
+        try:
+            cursor.execute("SELECT COUNT(*) FROM user_data")
+            count = cursor.fetchone()[0]
+            ranks = sorted({i * count // partitions for i in range(1, partitions)})
+            cuts = []
+            if count and ranks:
+                cursor.execute(
+                    "SELECT user_id FROM ("
+                    "SELECT user_id, ROW_NUMBER() OVER (ORDER BY user_id) - 1 AS row_rank "
+                    "FROM user_data) ranked "
+                    f"WHERE row_rank IN ({', '.join(['%s'] * len(ranks))}) "
+                    "ORDER BY user_id",
+                    ranks,
+                )
+                for (user_id,) in cursor.fetchall():
+                    if not cuts or user_id > cuts[-1]:
+                        cuts.append(user_id)
+        except DatabaseError as err:
+            print(f"Cannot sample partition bounds ({err}); using uniform ranges")
+            return uniform_ranges(partitions)
+        finally:
+            cursor.close()
+    bounds = [None] + cuts + [None]
+    return list(zip(bounds, bounds[1:]))
+
+
+def _range_filters(key_range, filters):
+    low, high = key_range
+    bounded = list(filters or ())
+    if low is not None:
+        bounded.append(("user_id", ">=", low))
+    if high is not None:
+        bounded.append(("user_id", "<", high))
+    return bounded
+
+
+def stream_partition(key_range, columns=None, filters=None,
+                     batch_size=PARTITION_BATCH_SIZE):
+    """
+    Generator that streams one user_id range in batches.
+
+    Args:
+        key_range (tuple): (low, high) as produced by sampled_ranges.
+        columns (iterable): Columns to fetch; all of them when None.
+        filters (list): Extra filter specs, as for stream_users_in_batches.
+        batch_size (int): Rows per fetchmany.
+
+    Yields:
+        list: A list of user dictionaries.
+    """
+    query, params, residual = build_select(
+        columns, _range_filters(key_range, filters)
+    )
+    with pooled_connection() as connection:
+        if not connection:
+            return
+        cursor = get_backend().server_cursor(connection, dictionary=True)
+        try:
+            cursor.execute(query, params)
+            while True:
+                batch = cursor.fetchmany(batch_size)
+                if not batch:
+                    break
+                batch = apply_residual(batch, residual)
+                if batch:
+                    yield batch
+        except DatabaseError as err:
+            print(f"Error executing query: {err}")
+        finally:
+            close_cursor(cursor)
+
+
+def partitioned_scan(partitions=4, columns=None, filters=None,
+                     batch_size=PARTITION_BATCH_SIZE, ranges=None, depth=4):
+    """
+    Generator that scans user_data on several connections at once.
+
+    Every partition is streamed by its own thread on its own pooled
+    connection (the shared pool is grown to `partitions` if needed). Their
+    batches are merged into one stream in arrival order, so rows are not
+    globally ordered. Each thread keeps at most `depth` batches queued.
+
+    Closing the generator early stops all partition threads and returns
+    their connections to the pool.
+
+    Yields:
+        list: A list of user dictionaries.
+    """
+    ranges = ranges or sampled_ranges(partitions)
+    _ensure_pool_size(len(ranges))
+    ready = queue.Queue(maxsize=depth * len(ranges))
+    stop = threading.Event()
+    finished = object()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                ready.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def scan(key_range):
+        batches = stream_partition(key_range, columns, filters, batch_size)
+        try:
+            for batch in batches:
+                if not put(batch):
+                    return
+        except BaseException as exc:
+            put(exc)
+            return
+        finally:
+            batches.close()
+        put(finished)
+
+    threads = [threading.Thread(target=scan, args=(key_range,),
+                                name=f"partition-{i}", daemon=True)
+               for i, key_range in enumerate(ranges)]
+    for thread in threads:
+        thread.start()
+
+    try:
+        remaining = len(threads)
+        while remaining:
+            item = ready.get()
+            if item is finished:
+                remaining -= 1
+            elif isinstance(item, BaseException):
+                raise item
+            else:
+                yield item
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+
+def _ensure_pool_size(connections):
+    if get_pool().size < connections:
+        configure_pool(size=connections)
+
+
+def _map_partition(map_fn, key_range, columns, filters, batch_size):
+    """Runs map_fn over one partition's batches (in a thread or process)."""
+    batches = stream_partition(key_range, columns, filters, batch_size)
+    try:
+        return map_fn(batches)
+    finally:
+        batches.close()
+
+
+def map_partitions(map_fn, reduce_fn=None, partitions=4, executor="thread",
+                   columns=None, filters=None, batch_size=PARTITION_BATCH_SIZE,
+                   ranges=None):
+    """
+    Runs a map/reduce job with one map task per partition.
+
+    Args:
+        map_fn (callable): Receives an iterator of batches for one partition
+            and returns that partition's partial result. With
+            executor="process" it must be a picklable module-level function.
+        reduce_fn (callable): Combines two partial results. When None the
+            list of partial results is returned.
+        partitions (int): Number of key ranges.
+        executor (str): "thread" shares this process's pool and suits
+            I/O-bound maps; "process" runs each map in a fresh worker process
+            with its own connection and suits CPU-bound maps.
+
+    Returns:
+        The reduced result, or the list of partial results.
+    """
+    ranges = ranges or sampled_ranges(partitions)
+    if executor == "thread":
+        _ensure_pool_size(len(ranges))
+        pool = ThreadPoolExecutor(max_workers=len(ranges))
+    elif executor == "process":
+        # spawn rather than fork: a forked child would inherit the parent's
+        # pooled MySQL sockets.
+        pool = ProcessPoolExecutor(
+            max_workers=len(ranges),
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    else:
+        raise ValueError(f"Unknown executor {executor!r}")
+
+    with pool:
+        futures = [pool.submit(_map_partition, map_fn, key_range, columns,
+                               filters, batch_size)
+                   for key_range in ranges]
+        partials = [future.result() for future in futures]
+
+    return reduce(reduce_fn, partials) if reduce_fn else partials
+
+
+def sum_and_count_ages(batches):
+    """map_fn for average_age: (sum of ages, number of users)."""
+    total = count = 0
+    for batch in batches:
+        total += sum(user['age'] for user in batch)
+        count += len(batch)
+    return total, count
+
+
+def add_pairs(a, b):
+    """reduce_fn for average_age."""
+    return a[0] + b[0], a[1] + b[1]
+
+
+def average_age(partitions=4, executor="thread"):
+    """Average user age computed by a partitioned map/reduce scan."""
+    total, count = map_partitions(sum_and_count_ages, add_pairs, partitions,
+                                  executor, columns=["age"])
+    return total / count if count else 0.0
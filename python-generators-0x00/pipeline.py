@@ -0,0 +1,420 @@
+"""
+Composable, lazy generator stages with per-stage instrumentation.
+
+Every stage is a generator function taking an upstream iterable as its
+first argument, so stages can be used on their own:
+
+    adults = filtered(unbatched(stream_users_in_batches(50)),
+                      lambda user: user['age'] > 25)
+
+or chained on a Pipeline, which also counts the items going in and out of
+every stage and times how long each one spends on its own work:
+
+    pipe = (Pipeline(stream_users_in_batches(50), name="users")
+            .unbatch()
+            .filter(lambda user: user['age'] > 25)
+            .map(lambda user: user['email'])
+            .take(100))
+    emails = list(pipe)
+    print(pipe.report())
+
+A stage's time excludes the time it spent waiting for its upstream, so the
+stage with the most time is the bottleneck. Time the consumer spent between
+items is reported separately. A stage that pulls its upstream on another
+thread (prefetch) overlaps with it, so it is timed on its own: its seconds
+are the time its downstream waited on it, and report() marks it as
+overlapped. Nothing runs until the pipeline is iterated;
+stopping early (take, break, close) closes every stage and the source, so
+a database generator returns its connection.
+"""
+import multiprocessing
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import (FIRST_COMPLETED, ProcessPoolExecutor,
+                                ThreadPoolExecutor, wait)
+from itertools import islice
+
+from prefetch import prefetched
+
+
+def mapped(iterable, fn):
+    """Yields fn(item) for every item."""
+    for item in iterable:
+        yield fn(item)
+
+
+def filtered(iterable, predicate):
+    """Yields the items for which predicate(item) is true."""
+    for item in iterable:
+        if predicate(item):
+            yield item
+
+
+def batched(iterable, size):
+    """Groups items into lists of `size`; the last one may be shorter."""
+    if size < 1:
+        raise ValueError("batch size must be at least 1")
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def unbatched(iterable):
+    """Flattens batches (any iterables) back into single items."""
+    for batch in iterable:
+        yield from batch
+
+
+def windowed(iterable, size, step=1, partial=False):
+    """
+    Yields tuples of `size` consecutive items, advancing `step` items each time.
+
+    step=1 gives sliding windows, step=size tumbling ones. A trailing
+    window with fewer than `size` items is only yielded when partial=True.
+    """
+    if size < 1 or step < 1:
+        raise ValueError("window size and step must be at least 1")
+    window = deque()
+    skip = 0    # items between windows, when step > size
+    fresh = 0   # items not yet part of a yielded window
+    for item in iterable:
+        if skip:
+            skip -= 1
+            continue
+        window.append(item)
+        fresh += 1
+        if len(window) == size:
+            yield tuple(window)
+            fresh = 0
+            if step >= size:
+                window.clear()
+                skip = step - size
+            else:
+                for _ in range(step):
+                    window.popleft()
+    if partial and fresh:
+        yield tuple(window)
+
+
+def deduplicated(iterable, key=None, max_keys=None):
+    """
+    Drops items whose key was already seen.
+
+    Args:
+        key (callable): Maps an item to a hashable key; the item itself
+            when None (dicts need a key, e.g. lambda u: u['user_id']).
+        max_keys (int): Remember only this many recent keys, bounding
+            memory at the cost of missing duplicates that far apart.
+    """
+    seen = OrderedDict()
+    for item in iterable:
+        marker = item if key is None else key(item)
+        if marker in seen:
+            seen.move_to_end(marker)
+            continue
+        seen[marker] = None
+        if max_keys is not None and len(seen) > max_keys:
+            seen.popitem(last=False)
+        yield item
+
+
+def take(iterable, n):
+    """Yields the first n items, without pulling an item more."""
+    if n <= 0:
+        return
+    for count, item in enumerate(iterable, 1):
+        yield item
+        if count >= n:
+            return
+
+
+def tee(iterable, *sinks):
+    """Passes every item through unchanged after handing it to each sink."""
+    for item in iterable:
+        for sink in sinks:
+            sink(item)
+        yield item
+
+
+def parallel_map(iterable, fn, workers=4, max_pending=None):
+    """
+    Yields fn(item) for every item, computed on a pool of threads.
+
+    Results come out in input order. At most `max_pending` items (default
+    2 * workers) are submitted ahead of the one being yielded, so a fast
+    upstream cannot queue the whole input in memory. Threads suit
+    I/O-bound or GIL-releasing work.
+    """
+    max_pending = max_pending or 2 * workers
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        try:
+            for item in iterable:
+                pending.append(pool.submit(fn, item))
+                if len(pending) >= max_pending:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def _pack(batch):
+    """
+    Compact picklable form of a batch: dict rows become plain tuples plus
+    one shared tuple of column names, so keys are not pickled per row.
+    """
+    if isinstance(batch, list) and batch and isinstance(batch[0], dict):
+        names = tuple(batch[0])
+        return names, [tuple(row.values()) for row in batch]
+    return None, batch
+
+
+def _apply_to_batch(fn, names, rows, per_batch):
+    """Worker side of process_map: rebuilds the rows and applies fn."""
+    if names is not None:
+        rows = [dict(zip(names, row)) for row in rows]
+    if per_batch:
+        return fn(rows)
+    return [fn(row) for row in rows]
+
+
+def process_map(batches, fn, workers=None, ordered=True, max_pending=None,
+                per_batch=False):
+    """
+    Yields fn applied to every batch's rows, computed in worker processes.
+
+    For CPU-bound transforms the GIL stops threads from helping; this
+    stage ships whole batches (e.g. from stream_users_in_batches) to a
+    process pool instead. Dict rows are sent as tuples plus one tuple of
+    column names (see _pack) and rebuilt as dicts in the worker; tuple,
+    namedtuple and columnar batches are pickled as they are. ColumnBatches
+    read from a snapshot (snapshot_cache) reference its mmap; pickling
+    copies their buffers, so they can be sent too.
+
+    Args:
+        batches: Iterable of batches (lists of rows, or ColumnBatches
+            with per_batch=True).
+        fn (callable): Applied to every row, or to the whole batch with
+            per_batch=True. Must be a picklable module-level function.
+        workers (int): Worker processes; os.cpu_count() when None.
+        ordered (bool): Yield results in input order. With False each
+            batch's results are yielded as soon as they are ready, so one
+            slow batch does not hold back the others.
+        max_pending (int): Batches in flight at once (default 2 * workers).
+            The upstream is not read further until one completes, which
+            bounds memory and keeps the database cursor at the pace of the
+            workers.
+        per_batch (bool): Call fn(batch) once per batch.
+
+    Yields:
+        list: fn's results for one batch (or fn(batch) with per_batch=True).
+    """
+    workers = workers or multiprocessing.cpu_count()
+    max_pending = max_pending or 2 * workers
+    # spawn rather than fork: a forked child would inherit the parent's
+    # pooled MySQL sockets (as in partitioned_scan.map_partitions).
+    pool = ProcessPoolExecutor(max_workers=workers,
+                               mp_context=multiprocessing.get_context("spawn"))
+    pending = deque() if ordered else set()
+    try:
+        for batch in batches:
+            names, rows = _pack(batch)
+            future = pool.submit(_apply_to_batch, fn, names, rows, per_batch)
+            if ordered:
+                pending.append(future)
+                if len(pending) >= max_pending:
+                    yield pending.popleft().result()
+            else:
+                pending.add(future)
+                if len(pending) >= max_pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield future.result()
+        if ordered:
+            while pending:
+                yield pending.popleft().result()
+        else:
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+class _Meter:
+    """Iterator wrapper counting the items pulled through it and the time."""
+
+    def __init__(self, iterable):
+        self.iterator = iter(iterable)
+        self.count = 0
+        self.seconds = 0.0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        started = time.perf_counter()
+        try:
+            item = next(self.iterator)
+        finally:
+            self.seconds += time.perf_counter() - started
+        self.count += 1
+        return item
+
+    def close(self):
+        close = getattr(self.iterator, 'close', None)
+        if close is not None:
+            close()
+
+
+class Pipeline:
+    """
+    A source iterable followed by a chain of instrumented stages.
+
+    Stage methods return the pipeline, so calls can be chained. A pipeline
+    can be iterated once; stats() and report() are available during and
+    after the run.
+
+    Args:
+        source: Any iterable, typically one of the stream generators.
+        name (str): Label for the source in stats.
+    """
+
+    def __init__(self, source, name="source"):
+        self.source = source
+        self.stages = [(name, None, False)]
+        self._meters = None
+        self._started = None
+        self._finished = None
+
+    def pipe(self, stage, *args, name=None, overlapped=False, **kwargs):
+        """
+        Appends any stage function stage(upstream, *args, **kwargs).
+
+        Pass overlapped=True for a stage that pulls its upstream on another
+        thread, so its upstream's time is not subtracted from its own.
+        """
+        def bound(upstream):
+            return stage(upstream, *args, **kwargs)
+
+        self.stages.append((name or stage.__name__, bound, overlapped))
+        return self
+
+    def map(self, fn, name="map"):
+        return self.pipe(mapped, fn, name=name)
+
+    def filter(self, predicate, name="filter"):
+        return self.pipe(filtered, predicate, name=name)
+
+    def batch(self, size, name="batch"):
+        return self.pipe(batched, size, name=name)
+
+    def unbatch(self, name="unbatch"):
+        return self.pipe(unbatched, name=name)
+
+    def window(self, size, step=1, partial=False, name="window"):
+        return self.pipe(windowed, size, step, partial, name=name)
+
+    def dedupe(self, key=None, max_keys=None, name="dedupe"):
+        return self.pipe(deduplicated, key, max_keys, name=name)
+
+    def take(self, n, name="take"):
+        return self.pipe(take, n, name=name)
+
+    def tee(self, *sinks, name="tee"):
+        return self.pipe(tee, *sinks, name=name)
+
+    def parallel_map(self, fn, workers=4, max_pending=None, name="parallel_map"):
+        return self.pipe(parallel_map, fn, workers, max_pending, name=name)
+
+    def process_map(self, fn, workers=None, ordered=True, max_pending=None,
+                    per_batch=False, name="process_map"):
+        return self.pipe(process_map, fn, workers, ordered, max_pending,
+                         per_batch, name=name)
+
+    def prefetch(self, depth=2, name="prefetch"):
+        return self.pipe(prefetched, depth, name=name, overlapped=True)
+
+    def __iter__(self):
+        if self._meters is not None:
+            raise RuntimeError("A Pipeline can only be iterated once")
+        meters = [_Meter(self.source)]
+        for _, stage, _ in self.stages[1:]:
+            meters.append(_Meter(stage(meters[-1])))
+        self._meters = meters
+        return self._run(meters)
+
+    def _run(self, meters):
+        self._started = time.perf_counter()
+        try:
+            yield from meters[-1]
+        finally:
+            self._finished = time.perf_counter()
+            # Downstream first, so no stage is left pulling from a closed source.
+            for meter in reversed(meters):
+                meter.close()
+
+    def stats(self):
+        """
+        Per-stage counters and timings.
+
+        Returns:
+            list: One dict per stage (the source first) with the stage name,
+            items_in, items_out, seconds spent in the stage itself, its
+            share of the run and whether it overlapped its upstream (then
+            seconds is the time spent waiting on it), followed by a
+            "consumer" entry for the time spent outside the pipeline.
+        """
+        if self._meters is None:
+            return []
+        end = self._finished or time.perf_counter()
+        wall = end - self._started
+        stats = []
+        previous = None
+        for (name, _, overlapped), meter in zip(self.stages, self._meters):
+            # The upstream of an overlapped stage was timed on another
+            # thread, concurrently with this one, so it is not subtracted.
+            own = meter.seconds
+            if previous and not overlapped:
+                own -= previous.seconds
+            stats.append({
+                'stage': name,
+                'items_in': previous.count if previous else None,
+                'items_out': meter.count,
+                'seconds': own,
+                'share': own / wall if wall else 0.0,
+                'overlapped': overlapped,
+            })
+            previous = meter
+        consumer = wall - previous.seconds
+        stats.append({'stage': 'consumer', 'items_in': previous.count,
+                      'items_out': None, 'seconds': consumer,
+                      'share': consumer / wall if wall else 0.0,
+                      'overlapped': False})
+        return stats
+
+    def report(self):
+        """
+        stats() as a table, with the slowest pipeline stage and the
+        overlapped ones marked.
+        """
+        stats = self.stats()
+        if not stats:
+            return "pipeline has not run"
+        slowest = max(stats[:-1], key=lambda s: s['seconds'])
+        lines = [f"{'stage':<16}{'in':>10}{'out':>10}{'seconds':>10}{'share':>8}"]
+        for s in stats:
+            items_in = '-' if s['items_in'] is None else s['items_in']
+            items_out = '-' if s['items_out'] is None else s['items_out']
+            flag = '  <- bottleneck' if s is slowest else ''
+            if s['overlapped']:
+                flag += '  (overlapped: waited on)'
+            lines.append(f"{s['stage']:<16}{items_in:>10}{items_out:>10}"
+                         f"{s['seconds']:>10.4f}{s['share']:>8.1%}{flag}")
+        return "\n".join(lines)
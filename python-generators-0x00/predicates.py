@@ -0,0 +1,130 @@
+"""
+Declarative filter and projection specs compiled into user_data SQL.
+
+A filter is either a (column, operator, value) tuple, which is compiled into
+the WHERE clause, or a plain callable taking a row dict and returning a
+bool, which SQL cannot express and is applied client-side afterwards:
+
+    filters = [
+        ("age", ">", 25),
+        ("email", "like", "%@gmail.com"),
+        ("name", "in", ["Alma Bechtelar", "Glenda Wisozk"]),
+        lambda user: user["name"].istitle(),
+    ]
+
+All tuple filters are ANDed together. Values are always bound as query
+parameters; column names and operators are checked against allow-lists
+because they are spliced into the SQL text.
+"""
+
+USER_COLUMNS = ("user_id", "name", "email", "age")
+
+COMPARISON_OPERATORS = ("=", "!=", "<", "<=", ">", ">=", "like", "not like")
+LIST_OPERATORS = ("in", "not in")
+
+
+def _check_column(column):
+    if column not in USER_COLUMNS:
+        raise ValueError(f"Unknown user_data column {column!r}")
+
+
+def compile_projection(columns=None):
+    """
+    Validates a column subset.
+
+    Returns:
+        tuple: The columns to SELECT, all of USER_COLUMNS when None.
+    """
+    if columns is None:
+        return USER_COLUMNS
+    columns = tuple(columns)
+    if not columns:
+        raise ValueError("A projection needs at least one column")
+    for column in columns:
+        _check_column(column)
+    return columns
+
+
+def compile_filters(filters=None):
+    """
+    Splits filter specs into a SQL WHERE clause and client-side predicates.
+
+    Args:
+        filters (iterable): Tuple specs and/or callables, see module docstring.
+
+    Returns:
+        tuple: (where, params, residual) where `where` is "" or a string
+        starting with "WHERE", `params` the values to bind in order and
+        `residual` the list of callables SQL could not express.
+    """
+    clauses = []
+    params = []
+    residual = []
+
+    for spec in filters or ():
+        if callable(spec):
+            residual.append(spec)
+            continue
+
+        try:
+            column, operator, value = spec
+        except (TypeError, ValueError):
+            raise ValueError(f"Filter {spec!r} is not (column, op, value)") from None
+        _check_column(column)
+        operator = operator.lower()
+
+        if operator in COMPARISON_OPERATORS:
+            if value is None:
+                raise ValueError(f"Use 'is null' / 'is not null' to compare "
+                                 f"{column} with None")
+            clauses.append(f"{column} {operator.upper()} %s")
+            params.append(value)
+        elif operator in LIST_OPERATORS:
+            values = list(value)
+            if not values:
+                # IN () is invalid SQL; an empty IN matches nothing.
+                clauses.append("1 = 0" if operator == "in" else "1 = 1")
+                continue
+            placeholders = ", ".join(["%s"] * len(values))
+            clauses.append(f"{column} {operator.upper()} ({placeholders})")
+            params.extend(values)
+        elif operator == "between":
+            low, high = value
+            clauses.append(f"{column} BETWEEN %s AND %s")
+            params.extend((low, high))
+        elif operator in ("is null", "is not null"):
+            clauses.append(f"{column} {operator.upper()}")
+        else:
+            raise ValueError(f"Unsupported filter operator {operator!r}")
+
+    where = "WHERE " + " AND ".join(clauses) if clauses else ""
+    return where, params, residual
+
+
+def build_select(columns=None, filters=None, table="user_data"):
+    """
+    Builds the SELECT for a filtered, projected scan of user_data.
+
+    Returns:
+        tuple: (query, params, residual) as in compile_filters.
+    """
+    projection = compile_projection(columns)
+    where, params, residual = compile_filters(filters)
+    query = f"SELECT {', '.join(projection)} FROM {table} {where}".rstrip()
+    return query, tuple(params), residual
+
+
+def apply_residual(rows, residual, names=None):
+    """
+    Keeps the rows every residual predicate accepts.
+
+    Predicates always receive a row dict; pass the column `names` when the
+    rows are tuples.
+    """
+    if not residual:
+        return rows
+    if names is None:
+        return [row for row in rows
+                if all(predicate(row) for predicate in residual)]
+    return [row for row in rows
+            if all(predicate(dict(zip(names, row))) for predicate in residual)]
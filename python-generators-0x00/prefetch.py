@@ -0,0 +1,79 @@
+import queue
+import threading
+
+# How often a blocked producer re-checks whether the consumer went away.
+POLL_INTERVAL = 0.1
+
+
+class _Done:
+    """End-of-stream marker, carrying the producer's exception if any."""
+
+    def __init__(self, error=None):
+        self.error = error
+
+
+def prefetched(iterable, depth=2):
+    """
+    Generator that reads ahead from `iterable` on a background thread.
+
+    Up to `depth` items are fetched into a bounded queue while the consumer
+    is still working on the current one, so producing and consuming overlap
+    and the pipeline runs at roughly max(produce, consume) time per item.
+
+    The iterable is advanced and closed on the background thread only. An
+    exception raised by it is re-raised to the consumer after the items
+    that were fetched before it. If the consumer stops early (close(),
+    islice, garbage collection) the thread is told to stop, closes the
+    source - releasing e.g. its database connection - and is joined.
+
+    Args:
+        iterable: The source, typically a generator of batches.
+        depth (int): Maximum number of items fetched ahead.
+
+    Yields:
+        The items of `iterable`, in order.
+    """
+    if depth < 1:
+        raise ValueError("prefetch depth must be at least 1")
+
+    ready = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+
+    def put(message):
+        while not stop.is_set():
+            try:
+                ready.put(message, timeout=POLL_INTERVAL)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        iterator = iter(iterable)
+        error = None
+        try:
+            for item in iterator:
+                if not put(item):
+                    return
+        except BaseException as exc:
+            error = exc
+        finally:
+            close = getattr(iterator, 'close', None)
+            if close is not None:
+                close()
+        put(_Done(error))
+
+    thread = threading.Thread(target=produce, name="prefetch", daemon=True)
+    thread.start()
+
+    try:
+        while True:
+            item = ready.get()
+            if isinstance(item, _Done):
+                if item.error is not None:
+                    raise item.error
+                return
+            yield item
+    finally:
+        stop.set()
+        thread.join()
@@ -0,0 +1,297 @@
+"""
+Row representations for streamed user_data rows.
+
+The cursors hand rows over as plain tuples; these helpers turn them into
+the format the caller asked for:
+
+    "dict"        {'user_id': ..., 'name': ..., ...}   (the default)
+    "tuple"       ('...', 'Alma Bechtelar', '...', 102)
+    "namedtuple"  UserRow(user_id=..., name=..., email=..., age=...)
+    "record"      UserRecord, a __slots__ class with attribute access
+    "columns"     ColumnBatch, one typed buffer per column (batch mode only)
+
+A dict costs a hash table per row; tuples, namedtuples and slotted records
+store the values inline, and a ColumnBatch needs a couple of flat buffers
+per column per batch instead of one object per row.
+"""
+from array import array
+from collections import namedtuple
+from functools import lru_cache
+
+from predicates import USER_COLUMNS
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; array('i') is the fallback
+    np = None
+
+INTEGER_COLUMNS = ("age",)
+
+ROW_FORMATS = ("dict", "tuple", "namedtuple", "record")
+BATCH_FORMATS = ROW_FORMATS + ("columns",)
+
+UserRow = namedtuple("UserRow", USER_COLUMNS)
+
+
+class UserRecord:
+    """A user row with attribute access and no per-instance __dict__."""
+
+    __slots__ = USER_COLUMNS
+
+    def __init__(self, user_id=None, name=None, email=None, age=None):
+        self.user_id = user_id
+        self.name = name
+        self.email = email
+        self.age = age
+
+    def __repr__(self):
+        return (f"UserRecord(user_id={self.user_id!r}, name={self.name!r}, "
+                f"email={self.email!r}, age={self.age!r})")
+
+    def __eq__(self, other):
+        if not isinstance(other, UserRecord):
+            return NotImplemented
+        return self.as_tuple() == other.as_tuple()
+
+    def as_tuple(self):
+        return (self.user_id, self.name, self.email, self.age)
+
+    def as_dict(self):
+        return dict(zip(USER_COLUMNS, self.as_tuple()))
+
+
+def _owned_int32(values):
+    """An array('i') copy of an int32 memoryview; arrays pass through."""
+    return array('i', values.tobytes()) if isinstance(values, memoryview) else values
+
+
+def _owned_bytes(data):
+    return data.tobytes() if isinstance(data, memoryview) else data
+
+
+class StringColumn:
+    """
+    A column of strings in Arrow's utf8 layout.
+
+    All values are UTF-8 encoded back to back in one bytes buffer; value i
+    is data[offsets[i]:offsets[i + 1]]. offsets is an int32 array of
+    length n + 1, so the pair can be handed to Arrow without copying.
+    """
+
+    __slots__ = ("offsets", "data")
+
+    def __init__(self, offsets, data):
+        self.offsets = offsets
+        self.data = data
+
+    @classmethod
+    def from_values(cls, values):
+        return cls.from_bytes(value.encode('utf-8') for value in values)
+
+    @classmethod
+    def from_bytes(cls, chunks):
+        chunks = list(chunks)
+        offsets = array('i', [0])
+        position = 0
+        for chunk in chunks:
+            position += len(chunk)
+            offsets.append(position)
+        return cls(offsets, b''.join(chunks))
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    # data/offsets may also be memoryviews (e.g. over an mmap'd snapshot),
+    # hence str(..., 'utf-8') rather than bytes.decode.
+    def __getitem__(self, i):
+        return str(self.data[self.offsets[i]:self.offsets[i + 1]], 'utf-8')
+
+    def __iter__(self):
+        data, offsets = self.data, self.offsets
+        for i in range(len(offsets) - 1):
+            yield str(data[offsets[i]:offsets[i + 1]], 'utf-8')
+
+    def __reduce__(self):
+        # Memoryviews (over a snapshot's mmap) cannot be pickled; ship copies.
+        return (StringColumn, (_owned_int32(self.offsets), _owned_bytes(self.data)))
+
+    def take(self, indices):
+        """A new StringColumn holding the values at `indices`, in order."""
+        data, offsets = self.data, self.offsets
+        return StringColumn.from_bytes(
+            data[offsets[i]:offsets[i + 1]] for i in indices
+        )
+
+
+class ColumnBatch:
+    """
+    A batch of rows stored column by column in typed buffers.
+
+    Integer columns (age) are packed into array('i') and string columns
+    into StringColumn (offsets + UTF-8 data). numeric() exposes an integer
+    column as a zero-copy NumPy array when NumPy is installed, so filters
+    can be evaluated as vectorised masks and applied with filter():
+
+        adults = batch.filter(batch.numeric("age") > 25)
+    """
+
+    __slots__ = ("names", "columns")
+
+    def __init__(self, names, columns):
+        self.names = tuple(names)
+        self.columns = dict(zip(self.names, columns))
+
+    @classmethod
+    def from_rows(cls, names, rows):
+        """Pivots a list of row tuples into typed columns."""
+        values = list(zip(*rows)) or [() for _ in names]
+        columns = []
+        for name, column in zip(names, values):
+            if name in INTEGER_COLUMNS:
+                columns.append(array('i', column))
+            else:
+                columns.append(StringColumn.from_values(column))
+        return cls(names, columns)
+
+    def __len__(self):
+        return len(self.columns[self.names[0]]) if self.names else 0
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def __reduce__(self):
+        # Pickled for process pools (pipeline.process_map). Integer columns
+        # that are memoryviews over a snapshot's mmap are copied into
+        # arrays; StringColumns copy their own buffers.
+        columns = [self.columns[name] for name in self.names]
+        return (ColumnBatch, (self.names, [
+            _owned_int32(column) if name in INTEGER_COLUMNS else column
+            for name, column in zip(self.names, columns)
+        ]))
+
+    def numeric(self, name):
+        """An integer column as a NumPy int32 view, or the array('i')."""
+        column = self.columns[name]
+        if np is not None:
+            return np.frombuffer(column, dtype=np.int32) if len(column) else \
+                np.zeros(0, dtype=np.int32)
+        return column
+
+    def rows(self):
+        """Iterates the batch as row tuples."""
+        return zip(*(self.columns[name] for name in self.names))
+
+    def filter(self, mask):
+        """
+        Keeps the rows where `mask` is true.
+
+        Args:
+            mask: A NumPy boolean array or any sequence of booleans.
+        """
+        if np is not None:
+            indices = np.flatnonzero(np.asarray(mask, dtype=bool))
+        else:
+            indices = [i for i, keep in enumerate(mask) if keep]
+        return self.take(indices)
+
+    def take(self, indices):
+        """A new ColumnBatch with the rows at `indices`, in order."""
+        columns = []
+        for name in self.names:
+            column = self.columns[name]
+            if isinstance(column, StringColumn):
+                columns.append(column.take(indices))
+            elif np is not None:
+                picked = np.frombuffer(column, dtype=np.int32)[indices] \
+                    if len(column) else np.zeros(0, dtype=np.int32)
+                columns.append(array('i', picked.tobytes()))
+            else:
+                columns.append(array('i', (column[i] for i in indices)))
+        return ColumnBatch(self.names, columns)
+
+    def to_arrow(self):
+        """
+        Wraps the buffers in a pyarrow.RecordBatch without copying them.
+
+        Raises:
+            ImportError: If pyarrow is not installed.
+        """
+        import pyarrow as pa
+
+        arrays = []
+        for name in self.names:
+            column = self.columns[name]
+            if isinstance(column, StringColumn):
+                arrays.append(pa.Array.from_buffers(
+                    pa.utf8(), len(column),
+                    [None, pa.py_buffer(column.offsets), pa.py_buffer(column.data)],
+                ))
+            else:
+                arrays.append(pa.Array.from_buffers(
+                    pa.int32(), len(column), [None, pa.py_buffer(column)],
+                ))
+        return pa.RecordBatch.from_arrays(arrays, names=list(self.names))
+
+
+def greater_than(batch, name, value):
+    """
+    Boolean mask of rows whose integer column `name` exceeds `value`.
+
+    A single vectorised comparison with NumPy; a list of bools otherwise.
+    """
+    column = batch.numeric(name)
+    if np is not None:
+        return column > value
+    return [item > value for item in column]
+
+
+@lru_cache(maxsize=None)
+def _namedtuple_for(names):
+    if names == USER_COLUMNS:
+        return UserRow
+    return namedtuple("UserRow", names)
+
+
+def _check(row_format, allowed):
+    if row_format not in allowed:
+        raise ValueError(f"Unknown row format {row_format!r}; "
+                         f"expected one of {', '.join(allowed)}")
+
+
+def row_converter(row_format, names=USER_COLUMNS):
+    """
+    Returns a function turning one row tuple into `row_format`.
+
+    Args:
+        row_format (str): One of ROW_FORMATS.
+        names (tuple): Column names of the tuples, in order.
+    """
+    _check(row_format, ROW_FORMATS)
+    names = tuple(names)
+    if row_format == "tuple":
+        return lambda row: row
+    if row_format == "dict":
+        return lambda row: dict(zip(names, row))
+    if row_format == "namedtuple":
+        return _namedtuple_for(names)._make
+    if names == USER_COLUMNS:
+        return lambda row: UserRecord(*row)
+    return lambda row: UserRecord(**dict(zip(names, row)))
+
+
+def batch_converter(row_format, names=USER_COLUMNS):
+    """
+    Returns a function turning a list of row tuples into `row_format`.
+
+    Args:
+        row_format (str): One of BATCH_FORMATS.
+        names (tuple): Column names of the tuples, in order.
+    """
+    _check(row_format, BATCH_FORMATS)
+    names = tuple(names)
+    if row_format == "tuple":
+        return lambda rows: rows
+    if row_format == "columns":
+        return lambda rows: ColumnBatch.from_rows(names, rows)
+    convert = row_converter(row_format, names)
+    return lambda rows: [convert(row) for row in rows]
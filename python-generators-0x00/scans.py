@@ -0,0 +1,420 @@
+"""
+Long scans of user_data that survive slow consumers and dropped connections.
+
+stream_users holds one unbuffered cursor for the whole iteration. A consumer
+that pauses between rows keeps that connection and its result set pinned on
+the server, and one that pauses past net_write_timeout gets the stream cut.
+robust_stream_users yields the same rows, in user_id order, in two modes:
+
+    "stream"   a server-side cursor over ORDER BY user_id, exactly like
+               stream_users. Used while the scan is young and the consumer
+               keeps up.
+    "chunked"  keyset queries (WHERE user_id > last ORDER BY user_id LIMIT
+               chunk_size). The connection goes back to the pool before the
+               rows of a chunk are handed out, so a slow consumer holds
+               nothing on the server.
+
+The scan switches from "stream" to "chunked" once it has streamed for longer
+than max_stream_seconds, or once the consumer takes longer than
+stall_seconds to ask for the next row. A suspended generator cannot notice a
+stall itself, so the registry's watchdog thread interrupts the scan: it
+cancels the streaming connection (KILL CONNECTION on MySQL), freeing it and
+its result set on the server while the consumer is away. When the consumer
+comes back, the scan carries on in "chunked" mode. When the connection
+drops (server gone away, lost during the query, net_write_timeout), the
+scan reconnects and continues with a keyset query after the last user_id
+it yielded, so no row is repeated or skipped.
+
+Every scan is recorded in a ScanRegistry (get_registry()): the running ones
+with their mode, row count and idle time, and a bounded history of finished
+ones with their duration and outcome:
+
+    for scan in get_registry().stalled(30):
+        print(scan.as_dict())
+"""
+import itertools
+import logging
+import threading
+import time
+from collections import deque
+
+from rows import row_converter
+from seed import (DATABASE_NAME, DatabaseError, close_cursor, get_backend,
+                  pooled_connection)
+
+paginate = __import__('2-lazy_paginate')
+
+logger = logging.getLogger(__name__)
+
+MAX_STREAM_SECONDS = 60.0
+STALL_SECONDS = 5.0
+WATCHDOG_INTERVAL = 1.0
+SCAN_CHUNK_SIZE = 1000
+RECONNECT_RETRIES = 3
+RECONNECT_BACKOFF = 0.5
+SCAN_HISTORY = 100
+
+# Client/server errors after which the same query can simply be re-issued on
+# a new connection: can't connect (2003), server has gone away (2006), lost
+# connection during query (2013) or at handshake (2055), server shutdown
+# (1053), disconnected for inactivity (4031).
+RECONNECT_ERRNOS = (2003, 2006, 2013, 2055, 1053, 4031)
+
+STREAM_QUERY = "SELECT user_id, name, email, age FROM user_data ORDER BY user_id"
+FIRST_CHUNK_QUERY = paginate.keyset_page_query("user_id", first_page=True)
+CHUNK_QUERY = paginate.keyset_page_query("user_id")
+
+
+class Scan:
+    """
+    The live record of one scan, updated by the scan as it runs.
+
+    Attributes:
+        id (int): Registry-wide sequence number.
+        name (str): What is being scanned, e.g. "stream_users".
+        mode (str): "stream" or "chunked".
+        status (str): "running", then "done", "closed" (the consumer
+            stopped early) or "failed".
+        rows (int): Rows yielded so far.
+        last_key (str): user_id of the last row yielded.
+        switch_reason (str): Why the scan left "stream" mode, if it did:
+            "stall", "timeout", "interrupted" (by the registry) or
+            "reconnect".
+        stall_seconds (float): Idle time after which the scan counts as
+            stalled.
+        reconnects (int): Connections re-opened after a dropped one.
+        chunks (int): Keyset queries run in "chunked" mode.
+        error (str): The error that ended a failed scan.
+    """
+
+    def __init__(self, id, name, mode, stall_seconds=STALL_SECONDS):
+        self.id = id
+        self.name = name
+        self.mode = mode
+        self.stall_seconds = stall_seconds
+        self.status = "running"
+        self.rows = 0
+        self.last_key = None
+        self.switch_reason = None
+        self.reconnects = 0
+        self.chunks = 0
+        self.error = None
+        self.started_at = time.time()
+        self.started = time.monotonic()
+        self.finished = None
+        self.yielded = self.started  # monotonic time of the last row handed out
+        # The streaming connection, while there is one. interrupt() cancels
+        # it under the lock, so it is never cancelled after going back to
+        # the pool.
+        self.connection = None
+        self.interrupted = False
+        self.lock = threading.Lock()
+
+    @property
+    def duration(self):
+        """Seconds from start to finish, or until now while running."""
+        return (self.finished or time.monotonic()) - self.started
+
+    @property
+    def idle(self):
+        """Seconds since the last row was handed out (0 once finished)."""
+        return 0.0 if self.finished else time.monotonic() - self.yielded
+
+    def as_dict(self):
+        return {
+            "id": self.id,
+            "name": self.name,
+            "mode": self.mode,
+            "status": self.status,
+            "rows": self.rows,
+            "last_key": self.last_key,
+            "switch_reason": self.switch_reason,
+            "interrupted": self.interrupted,
+            "reconnects": self.reconnects,
+            "chunks": self.chunks,
+            "error": self.error,
+            "started_at": self.started_at,
+            "duration": self.duration,
+            "idle": self.idle,
+        }
+
+    def __repr__(self):
+        return (f"Scan({self.id}, {self.name!r}, {self.status}, {self.mode}, "
+                f"{self.rows} rows, {self.duration:.1f}s)")
+
+
+class ScanRegistry:
+    """
+    Tracks running scans and keeps a bounded history of finished ones.
+
+    Scans only update their own counters while they run; the registry lock
+    is taken when a scan starts and finishes, and by the readers.
+    """
+
+    def __init__(self, history=SCAN_HISTORY):
+        self._ids = itertools.count(1)
+        self._active = {}
+        self._history = deque(maxlen=history)
+        self._lock = threading.Lock()
+        self._watchdog = None
+
+    def start(self, name, mode, stall_seconds=STALL_SECONDS):
+        with self._lock:
+            scan = Scan(next(self._ids), name, mode, stall_seconds)
+            self._active[scan.id] = scan
+        return scan
+
+    def finish(self, scan, status):
+        scan.status = status
+        scan.finished = time.monotonic()
+        with self._lock:
+            self._active.pop(scan.id, None)
+            self._history.append(scan)
+        logger.info("%r finished", scan)
+
+    def active(self):
+        """Running scans, oldest first."""
+        with self._lock:
+            return list(self._active.values())
+
+    def stalled(self, seconds=None):
+        """
+        Running scans whose consumer has not asked for a row in `seconds`
+        (by default each scan's own stall_seconds).
+        """
+        return [scan for scan in self.active()
+                if scan.idle > (scan.stall_seconds if seconds is None else seconds)]
+
+    def interrupt(self, scan):
+        """
+        Cancels a scan's streaming connection while its consumer is away.
+
+        The connection and its server-side result set are freed now. The
+        scan notices when the consumer asks for the next row and continues
+        with chunked keyset reads from there.
+
+        Returns:
+            bool: Whether there was a streaming connection to cancel.
+        """
+        with scan.lock:
+            if scan.connection is None or scan.interrupted:
+                return False
+            scan.interrupted = True
+            try:
+                get_backend().cancel(scan.connection)
+            except DatabaseError as err:
+                logger.warning("Could not cancel the connection of %r: %s", scan, err)
+        logger.warning("%r interrupted after %.1f s idle", scan, scan.idle)
+        return True
+
+    def interrupt_stalled(self, seconds=None):
+        """Interrupts every stalled scan (see stalled); returns them."""
+        return [scan for scan in self.stalled(seconds) if self.interrupt(scan)]
+
+    def watch(self, interval=WATCHDOG_INTERVAL):
+        """
+        Starts the watchdog, a daemon thread that runs interrupt_stalled
+        every `interval` seconds. Does nothing if it is already running.
+        """
+        with self._lock:
+            if self._watchdog is not None:
+                return
+            self._watchdog = threading.Thread(target=self._watch, args=(interval,),
+                                              name="scan-watchdog", daemon=True)
+        self._watchdog.start()
+
+    def _watch(self, interval):
+        while True:
+            time.sleep(interval)
+            try:
+                self.interrupt_stalled()
+            except Exception:  # Keep watching; one bad cancel is not fatal
+                logger.exception("Scan watchdog failed")
+
+    def history(self):
+        """Finished scans, oldest first."""
+        with self._lock:
+            return list(self._history)
+
+    def stats(self):
+        """Counts by status and the duration of the finished scans."""
+        finished = self.history()
+        durations = [scan.duration for scan in finished]
+        by_status = {}
+        for scan in finished:
+            by_status[scan.status] = by_status.get(scan.status, 0) + 1
+        return {
+            "active": len(self.active()),
+            "finished": len(finished),
+            "by_status": by_status,
+            "switched": sum(1 for scan in finished if scan.switch_reason),
+            "reconnects": sum(scan.reconnects for scan in finished),
+            "mean_duration": sum(durations) / len(durations) if durations else 0.0,
+            "max_duration": max(durations, default=0.0),
+        }
+
+    def report(self):
+        """Prints the running scans and the recent finished ones."""
+        for label, scans in (("Running", self.active()), ("Finished", self.history())):
+            print(f"{label} scans:")
+            for scan in scans:
+                print(f"  #{scan.id:<5}{scan.name:<16}{scan.status:<8}{scan.mode:<8}"
+                      f"{scan.rows:>10} rows {scan.duration:8.2f} s "
+                      f"idle {scan.idle:6.2f} s  reconnects {scan.reconnects}"
+                      + (f"  switched: {scan.switch_reason}" if scan.switch_reason else ""))
+
+
+_registry = ScanRegistry()
+
+
+def get_registry():
+    """Returns the process-wide ScanRegistry."""
+    return _registry
+
+
+def _reconnectable(err):
+    return getattr(err, 'errno', None) in RECONNECT_ERRNOS
+
+
+def _not_connected():
+    # The pool hands out None when the server cannot be reached.
+    return DatabaseError(msg=f"Could not connect to {DATABASE_NAME}", errno=2003)
+
+
+def _stream(scan, convert, max_stream_seconds, stall_seconds):
+    """
+    Streams rows from one server-side cursor until the table ends (returns
+    True) or the scan should continue in chunked mode (returns False).
+    """
+    with pooled_connection() as connection:
+        if not connection:
+            raise _not_connected()
+        cursor = get_backend().server_cursor(connection)
+        scan.connection = connection
+        try:
+            cursor.execute(STREAM_QUERY)
+            deadline = time.monotonic() + max_stream_seconds
+            for row in cursor:
+                scan.last_key = row[0]
+                scan.rows += 1
+                scan.yielded = handed = time.monotonic()
+                yield convert(row)
+                if scan.interrupted:
+                    scan.switch_reason = "interrupted"
+                    return False
+                now = time.monotonic()
+                if now - handed > stall_seconds:
+                    scan.switch_reason = "stall"
+                    return False
+                if now > deadline:
+                    scan.switch_reason = "timeout"
+                    return False
+            return True
+        finally:
+            with scan.lock:
+                scan.connection = None
+            # Leaving early abandons the rest of the result set; the pool
+            # then drops the connection, which frees it on the server.
+            close_cursor(cursor)
+
+
+def _chunks(scan, convert, chunk_size):
+    """Yields the rows after scan.last_key with one keyset query per chunk."""
+    while True:
+        with pooled_connection() as connection:
+            if not connection:
+                raise _not_connected()
+            cursor = connection.cursor()
+            try:
+                if scan.last_key is None:
+                    cursor.execute(FIRST_CHUNK_QUERY, (chunk_size,))
+                else:
+                    cursor.execute(CHUNK_QUERY, (scan.last_key, chunk_size))
+                chunk = cursor.fetchall()
+            finally:
+                cursor.close()
+        scan.chunks += 1
+        # The connection is back in the pool before the consumer sees a row.
+        for row in chunk:
+            scan.last_key = row[0]
+            scan.rows += 1
+            scan.yielded = time.monotonic()
+            yield convert(row)
+        if len(chunk) < chunk_size:
+            return
+
+
+def robust_stream_users(row_format="dict", max_stream_seconds=MAX_STREAM_SECONDS,
+                        stall_seconds=STALL_SECONDS, chunk_size=SCAN_CHUNK_SIZE,
+                        retries=RECONNECT_RETRIES, name="stream_users",
+                        watchdog=True):
+    """
+    Generator yielding every user in user_id order, robust to long scans.
+
+    Args:
+        row_format (str): One of rows.ROW_FORMATS.
+        max_stream_seconds (float): How long to keep one server-side cursor
+            open before switching to chunked keyset queries (0 starts
+            chunked).
+        stall_seconds (float): A pause of the consumer between two rows
+            longer than this also switches to chunked mode. With the
+            watchdog the streaming connection is cancelled during the pause
+            (within WATCHDOG_INTERVAL of it passing); without, only when
+            the consumer resumes.
+        chunk_size (int): Rows per keyset query in chunked mode.
+        retries (int): Reconnect attempts in a row, without progress in
+            between, before the scan gives up.
+        name (str): Label of the scan in the registry.
+        watchdog (bool): Start the registry's watchdog (see
+            ScanRegistry.watch), unless it is already running.
+
+    Yields:
+        The rows in `row_format`.
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk size must be at least 1")
+    convert = row_converter(row_format)
+    mode = "stream" if max_stream_seconds > 0 else "chunked"
+    scan = _registry.start(name, mode, stall_seconds)
+    if watchdog and mode == "stream":
+        _registry.watch()
+    status = "failed"
+    failures = 0
+    rows_at_failure = 0
+
+    try:
+        while True:
+            try:
+                if scan.mode == "stream":
+                    if (yield from _stream(scan, convert, max_stream_seconds,
+                                           stall_seconds)):
+                        break
+                    logger.info("%r switching to chunked reads (%s)", scan,
+                                scan.switch_reason)
+                    scan.mode = "chunked"
+                yield from _chunks(scan, convert, chunk_size)
+                break
+            except DatabaseError as err:
+                if scan.rows > rows_at_failure:
+                    failures = 0
+                failures += 1
+                rows_at_failure = scan.rows
+                # Reads on an interrupted connection fail like a dropped one.
+                if not (_reconnectable(err) or scan.interrupted) or failures > retries:
+                    raise
+                logger.warning("%r lost its connection (%s); resuming after "
+                               "user_id %s", scan, err, scan.last_key)
+                scan.reconnects += 1
+                if scan.mode == "stream":
+                    scan.mode = "chunked"
+                    scan.switch_reason = "interrupted" if scan.interrupted else "reconnect"
+                time.sleep(RECONNECT_BACKOFF * 2 ** (failures - 1))
+        status = "done"
+    except DatabaseError as err:
+        scan.error = str(err)
+        print(f"Error executing query: {err}")
+    except GeneratorExit:
+        status = "closed"
+        raise
+    finally:
+        _registry.finish(scan, status)
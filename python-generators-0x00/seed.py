@@ -1,47 +1,353 @@
-import mysql.connector
 import csv
+import json
+import os
+import tempfile
+import threading
+import time
 import uuid
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from contextlib import contextmanager
+from itertools import islice
+
+from backends import (BACKENDS, SQLITE_PATH, DatabaseError, MySQLBackend,
+                      SQLiteBackend)
 
 DB_CONFIG = {
-    'host': 'localhost',
-    'user': 'root',
-    'password': '0243',
+    'host': os.environ.get("PRODEV_MYSQL_HOST", 'localhost'),
+    'user': os.environ.get("PRODEV_MYSQL_USER", 'root'),
+    'password': os.environ.get("PRODEV_MYSQL_PASSWORD", '0243'),
     'raise_on_warnings': True,
-    'port': 3306,
+    'port': int(os.environ.get("PRODEV_MYSQL_PORT", 3306)),
     "autocommit": True,
 }
 DATABASE_NAME = "ALX_prodev"
+POOL_SIZE = 5
+POOL_IDLE_TIMEOUT = 300
+
+_backend = None
+
+
+def get_backend():
+    """
+    Returns the storage backend chosen by the environment.
+
+    PRODEV_BACKEND is "mysql" (the default) or "sqlite"; the SQLite file is
+    PRODEV_SQLITE_PATH (prodev.sqlite3 by default). Process-pool workers
+    inherit the environment, so they use the same backend.
+    """
+    global _backend
+    if _backend is None:
+        name = os.environ.get("PRODEV_BACKEND", "mysql")
+        if name == "mysql":
+            _backend = MySQLBackend(DB_CONFIG, DATABASE_NAME)
+        elif name == "sqlite":
+            _backend = SQLiteBackend(os.environ.get("PRODEV_SQLITE_PATH", SQLITE_PATH))
+        else:
+            raise ValueError(f"Unknown PRODEV_BACKEND {name!r}; expected one of "
+                             f"{', '.join(BACKENDS)}")
+    return _backend
+
+
+def use_backend(name, path=None):
+    """
+    Switches this process (and processes it starts) to another backend.
+
+    The shared pool is replaced, so later pooled connections come from the
+    new backend; connections already checked out are closed on release.
+
+    Args:
+        name (str): "mysql" or "sqlite".
+        path (str): SQLite database file.
+    """
+    global _backend
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown backend {name!r}; expected one of {', '.join(BACKENDS)}")
+    os.environ["PRODEV_BACKEND"] = name
+    if path is not None:
+        os.environ["PRODEV_SQLITE_PATH"] = path
+    _backend = None
+    configure_pool(connect=connect_to_prodev)
+    return get_backend()
+
 
 def connect_db():
     try:
-        connection = mysql.connector.connect(**DB_CONFIG)
+        connection = get_backend().connect(database=False)
         return connection
-    except mysql.connector.Error as err:
-        print(f"[connect_db] Error connecting to MySQL: {err}")
+    except DatabaseError as err:
+        print(f"[connect_db] Error connecting to the database server: {err}")
         return None
     
 def create_database(connection):
     cursor = connection.cursor()
     try:
-        cursor.execute(f"CREATE DATABASE IF NOT EXISTS {DATABASE_NAME}")
+        get_backend().create_database(cursor)
         print(f"Database {DATABASE_NAME} ensured.")
-    except mysql.connector.Error as err:
+    except DatabaseError as err:
         print(f"[create_database] Failed creating database: {err}")
     finally:
         cursor.close()
 
 
-def connect_to_prodev():
-    prodev_config = DB_CONFIG.copy()
-    prodev_config['database'] = DATABASE_NAME
-    
+def connect_to_prodev(**options):
+    # Per-connection overrides, e.g. allow_local_infile=True for bulk loads
     try:
-        connection = mysql.connector.connect(**prodev_config)
+        connection = get_backend().connect(**options)
         return connection
-    except mysql.connector.Error as err:
+    except DatabaseError as err:
         print(f"Error connecting to {DATABASE_NAME}: {err}")
         return None
     
+class PoolTimeoutError(DatabaseError):
+    """Raised when no pooled connection became free within the wait timeout."""
+
+
+class ConnectionPool:
+    """
+    A bounded pool of connections to the ALX_prodev database.
+
+    At most `size` connections are open at once. Borrowers block (up to
+    `timeout` seconds) when all of them are checked out. Connections idle
+    for longer than `idle_timeout` seconds are closed, and every borrowed
+    connection is health-checked first so a dead one is replaced rather
+    than handed out.
+    """
+
+    def __init__(self, size=POOL_SIZE, idle_timeout=POOL_IDLE_TIMEOUT,
+                 connect=None):
+        """
+        Args:
+            size (int): Maximum number of open connections.
+            idle_timeout (float): Seconds an idle connection is kept around.
+            connect (callable): Connection factory, connect_to_prodev by
+                default. It returns None when the server cannot be reached.
+        """
+        self.size = size
+        self.idle_timeout = idle_timeout
+        self._connect = connect or connect_to_prodev
+        self._idle = deque()  # (connection, returned_at), newest on the right
+        self._open = 0
+        self._closed = False
+        self._lock = threading.Condition()
+        self._stats = {
+            'hits': 0,          # borrowed an idle connection
+            'misses': 0,        # had to open a new connection
+            'waits': 0,         # had to block for a free connection
+            'wait_time': 0.0,   # total seconds spent blocking
+            'timeouts': 0,      # gave up waiting
+            'discarded': 0,     # failed health check or returned broken
+            'expired': 0,       # closed after idle_timeout
+        }
+
+    def stats(self):
+        """Returns a snapshot of the hit/miss/wait counters and pool usage."""
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot['open'] = self._open
+            snapshot['idle'] = len(self._idle)
+            snapshot['in_use'] = self._open - len(self._idle)
+        return snapshot
+
+    def _expire_idle(self, now):
+        """Closes idle connections older than idle_timeout. Holds the lock."""
+        # The oldest returns sit on the left of the deque.
+        while self._idle and now - self._idle[0][1] > self.idle_timeout:
+            connection, _ = self._idle.popleft()
+            self._open -= 1
+            self._stats['expired'] += 1
+            _close_quietly(connection)
+
+    def acquire(self, timeout=None):
+        """
+        Borrows a connection, blocking while the pool is exhausted.
+
+        Args:
+            timeout (float): Maximum seconds to wait, or None to wait forever.
+
+        Returns:
+            The connection, or None if a new one could not be opened.
+
+        Raises:
+            PoolTimeoutError: If no connection became free within `timeout`.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        waited_since = None
+        with self._lock:
+            while True:
+                self._expire_idle(time.monotonic())
+                if self._idle:
+                    connection, _ = self._idle.pop()
+                    if _is_healthy(connection):
+                        self._stats['hits'] += 1
+                        break
+                    self._open -= 1
+                    self._stats['discarded'] += 1
+                    _close_quietly(connection)
+                    continue
+                if self._open < self.size:
+                    # Reserve the slot, then connect outside the lock so a
+                    # slow handshake does not stall other borrowers.
+                    self._open += 1
+                    self._stats['misses'] += 1
+                    connection = None
+                    break
+                if waited_since is None:
+                    waited_since = time.monotonic()
+                    self._stats['waits'] += 1
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    self._stats['timeouts'] += 1
+                    self._stats['wait_time'] += time.monotonic() - waited_since
+                    raise PoolTimeoutError(
+                        f"No pooled connection free after {timeout} seconds"
+                    )
+                self._lock.wait(remaining)
+            if waited_since is not None:
+                self._stats['wait_time'] += time.monotonic() - waited_since
+
+        if connection is None:
+            connection = self._connect()
+            if connection is None:
+                with self._lock:
+                    self._open -= 1
+                    self._lock.notify()
+        return connection
+
+    def release(self, connection, discard=False):
+        """
+        Returns a borrowed connection to the pool.
+
+        Connections that are flagged for discard, still have an unread
+        result set (e.g. a stream abandoned half-way) or fail to roll back
+        an open transaction are closed instead of being reused.
+        """
+        if connection is None:
+            return
+        if not discard:
+            try:
+                if connection.unread_result:
+                    discard = True
+                elif connection.in_transaction:
+                    connection.rollback()
+            except DatabaseError:
+                discard = True
+        with self._lock:
+            if discard or self._closed:
+                self._open -= 1
+                self._stats['discarded'] += 1
+                _close_quietly(connection)
+            else:
+                now = time.monotonic()
+                self._idle.append((connection, now))
+                self._expire_idle(now)
+            self._lock.notify()
+
+    @contextmanager
+    def connection(self, timeout=None):
+        """
+        Checks out a connection for the duration of a with-block.
+
+        The connection is discarded rather than reused if the block raises.
+
+        Yields:
+            The connection, or None if the server could not be reached.
+        """
+        connection = self.acquire(timeout)
+        discard = False
+        try:
+            yield connection
+        except GeneratorExit:
+            # A streaming generator closed early; release() still checks
+            # for an abandoned result set.
+            raise
+        except BaseException:
+            discard = True
+            raise
+        finally:
+            self.release(connection, discard)
+
+    def close(self):
+        """Closes every idle connection. Checked-out ones close on release."""
+        with self._lock:
+            self._closed = True
+            while self._idle:
+                connection, _ = self._idle.pop()
+                self._open -= 1
+                _close_quietly(connection)
+
+
+def _is_healthy(connection):
+    """Health check run on borrow: pings the server without reconnecting."""
+    try:
+        return connection.is_connected()
+    except DatabaseError:
+        return False
+
+
+def _close_quietly(connection):
+    try:
+        connection.close()
+    except DatabaseError:
+        pass
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Returns the process-wide ConnectionPool, creating it on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ConnectionPool()
+        return _pool
+
+
+def configure_pool(size=POOL_SIZE, idle_timeout=POOL_IDLE_TIMEOUT, connect=None):
+    """
+    Replaces the shared pool with one of a different size or idle timeout.
+
+    Idle connections of the old pool are closed; connections still checked
+    out of it are closed when they are returned. The new pool keeps the old
+    pool's connection factory unless `connect` is given (e.g.
+    a factory for a separate benchmark database).
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            connect = connect or _pool._connect
+        _pool = ConnectionPool(size, idle_timeout, connect)
+        return _pool
+
+
+def pooled_connection(timeout=None):
+    """
+    Checks a connection out of the shared pool.
+
+    Usage:
+        with pooled_connection() as connection:
+            ...
+    """
+    return get_pool().connection(timeout)
+
+
+def close_cursor(cursor):
+    """
+    Closes a cursor, tolerating a result set the consumer stopped reading.
+
+    mysql.connector refuses to close a cursor with unread rows; the
+    connection is then flagged as having an unread result and the pool
+    discards it on release instead of draining the remaining rows.
+    """
+    try:
+        cursor.close()
+    except DatabaseError:
+        pass
+
+
 def create_table(connection):
     cursor = connection.cursor()
     table_creation_query = f"""
@@ -56,60 +362,623 @@ def create_table(connection):
         cursor.execute(table_creation_query)
         connection.commit()
         print("Table user_data created successfully")
-    except mysql.connector.Error as err:
+    except DatabaseError as err:
         print(f"Failed creating table: {err}")
     finally:
         cursor.close()
 
 
-def insert_data(connection, data_file):
+# Set by the server on every insert and update once change tracking is on.
+CHANGE_COLUMN = "updated_at"
+
+# Columns keyset pagination may order on besides user_id; each needs an
+# (column, user_id) index to seek instead of sorting the whole table.
+KEYSET_INDEX_COLUMNS = ("name", "email", "age")
+
+
+def has_column(connection, table, column):
+    """Whether `table` in the current database has `column`."""
     cursor = connection.cursor()
-    
-    insert_query = "INSERT INTO user_data (user_id, name, email, age) VALUES (%s, %s, %s, %s)"
-    
+    try:
+        return get_backend().has_column(cursor, table, column)
+    finally:
+        cursor.close()
+
+
+def has_index(connection, table, index):
+    """Whether `table` in the current database has an index named `index`."""
+    cursor = connection.cursor()
+    try:
+        return get_backend().has_index(cursor, table, index)
+    finally:
+        cursor.close()
+
+
+def add_keyset_indexes(connection, columns=KEYSET_INDEX_COLUMNS):
+    """
+    Adds the (column, user_id) indexes keyset pages ordered on `columns` need.
+
+    With the index each page is a range scan from the seek key; without it
+    every page sorts the whole table, so a full walk is quadratic again.
+    The indexes cost some insert speed, which is why create_table does not
+    add them. Indexes that already exist are left alone.
+    """
+    cursor = connection.cursor()
+    try:
+        for column in columns:
+            index = f"idx_user_data_{column}"
+            if get_backend().has_index(cursor, "user_data", index):
+                continue
+            cursor.execute(f"CREATE INDEX {index} ON user_data ({column}, user_id)")
+            print(f"Index {index} created on user_data")
+    except DatabaseError as err:
+        print(f"Failed adding keyset indexes: {err}")
+    finally:
+        cursor.close()
+
+
+def add_change_tracking(connection):
+    """
+    Adds the updated_at change column to user_data, if it is missing.
+
+    MySQL sets it on every insert and update with microsecond precision,
+    and the (updated_at, user_id) index lets incremental scans seek
+    straight to the rows changed since a high-water mark. Existing rows
+    get the time of the migration. MySQL only.
+    """
+    if not get_backend().supports_change_tracking:
+        print(f"Change tracking is not supported on the {get_backend().name} backend")
+        return
+    if has_column(connection, "user_data", CHANGE_COLUMN):
+        return
+    cursor = connection.cursor()
+    try:
+        cursor.execute(f"""
+        ALTER TABLE user_data
+            ADD COLUMN {CHANGE_COLUMN} TIMESTAMP(6) NOT NULL
+                DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6),
+            ADD INDEX idx_user_data_changes ({CHANGE_COLUMN}, user_id)
+        """)
+        print("Change tracking enabled on user_data")
+    except DatabaseError as err:
+        print(f"Failed adding change tracking: {err}")
+    finally:
+        cursor.close()
+
+
+INSERT_CHUNK_SIZE = 1000
+INGEST_RETRIES = 2
+PROGRESS_INTERVAL = 5.0
+
+
+# Namespace for deterministic user_ids (see row_uuid).
+USER_ID_NAMESPACE = uuid.UUID('6f1c2f4e-5d0a-4b8e-9c7d-2a3b4c5d6e7f')
+
+
+def iter_user_records(data_file, start=0, end=None):
+    """
+    Generator that parses the user CSV between two byte offsets.
+
+    Records must not contain embedded newlines, so every line is one
+    record and any byte range aligned on line starts (see shard_ranges)
+    can be parsed independently of the rest of the file.
+
+    Args:
+        data_file (str): Path to a CSV with a name,email,age header.
+        start (int): Offset of the first line to read; the header is
+            skipped when reading from 0.
+        end (int): Stop before the first line starting at or after this
+            offset, or None to read to the end of the file.
+
+    Yields:
+        tuple: (offset, name, email, age) with offset the line's byte offset.
+    """
+    with open(data_file, mode='rb') as file:
+        file.seek(start)
+        position = start
+        if start == 0:
+            position += len(file.readline())  # Skip the header row
+
+        line_offsets = []
+
+        def lines():
+            nonlocal position
+            while end is None or position < end:
+                line = file.readline()
+                if not line:
+                    return
+                line_offsets.append(position)
+                position += len(line)
+                yield line.decode('utf-8')
+
+        for row in csv.reader(lines()):
+            offset = line_offsets.pop()
+            # We need to convert 'age' to an integer for the INT column
+            try:
+                age = int(row[2])
+            except (ValueError, IndexError) as e:
+                print(f"Skipping row due to invalid age: {row}. Error: {e}")
+                continue
+
+            yield (offset, row[0], row[1], age)
+
+
+def row_uuid(offset, name, email, age):
+    """
+    Derives a stable user_id from a record's position and content.
+
+    Re-reading the same file always yields the same ids, so re-inserting a
+    range that was already committed is a no-op under backend.bulk_insert.
+    """
+    return str(uuid.uuid5(USER_ID_NAMESPACE, f"{offset}:{name},{email},{age}"))
+
+
+def read_user_rows(data_file, after=None):
+    """
+    Generator that streams insertable rows out of the user CSV file.
+
+    Only one CSV record is held in memory at a time, so the file can be
+    arbitrarily large. user_ids come from row_uuid, so every read of the
+    same file produces the same ids.
+
+    Args:
+        data_file (str): Path to a CSV with a name,email,age header.
+        after (int): Only yield records whose byte offset is greater than
+            this (the offset of the last record already loaded).
+
+    Yields:
+        tuple: (user_id, name, email, age) ready for the backend's
+        bulk_insert.
+    """
+    for offset, name, email, age in _records_after(data_file, after):
+        yield (row_uuid(offset, name, email, age), name, email, age)
+
+
+def _records_after(data_file, after):
+    """iter_user_records, resumed after the record at byte offset `after`."""
+    if after is None:
+        return iter_user_records(data_file)
+    # Start on the last loaded record's line, which is a line boundary,
+    # and drop that record itself.
+    return (record for record in iter_user_records(data_file, start=after)
+            if record[0] > after)
+
+
+def checkpoint_path(data_file):
+    """Default checkpoint file used by insert_data for a CSV file."""
+    return f"{data_file}.checkpoint"
+
+
+def load_checkpoint(path, data_file):
+    """
+    Reads a seeding checkpoint written by save_checkpoint.
+
+    Returns:
+        dict: {'offset': ..., 'rows': ...} for the last committed record, or
+        None if there is no checkpoint or it belongs to a different (or
+        since modified) data file.
+    """
+    try:
+        with open(path, encoding='utf-8') as file:
+            state = json.load(file)
+    except FileNotFoundError:
+        return None
+    except ValueError as err:
+        print(f"Ignoring unreadable checkpoint {path}: {err}")
+        return None
+
+    stat = os.stat(data_file)
+    if (state.get('data_file') != os.path.abspath(data_file)
+            or state.get('size') != stat.st_size
+            or state.get('mtime') != stat.st_mtime):
+        print(f"Ignoring checkpoint {path}: {data_file} has changed.")
+        return None
+    return state
+
+
+def save_checkpoint(path, data_file, offset, rows):
+    """
+    Atomically records the byte offset and count of committed records.
+
+    insert_data writes one with offset 0 before its first chunk and then
+    one after each commit. If the process dies between a commit and the
+    next write, the rerun repeats the chunks since the previous checkpoint
+    (from the start of the file, for the first chunk); their deterministic
+    user_ids make that harmless.
+    """
+    stat = os.stat(data_file)
+    state = {
+        'data_file': os.path.abspath(data_file),
+        'size': stat.st_size,
+        'mtime': stat.st_mtime,
+        'offset': offset,
+        'rows': rows,
+    }
+    temp_path = f"{path}.tmp"
+    with open(temp_path, mode='w', encoding='utf-8') as file:
+        json.dump(state, file)
+    os.replace(temp_path, path)
+
+
+def _report_progress(label, rows, started):
+    elapsed = time.monotonic() - started
+    rate = rows / elapsed if elapsed > 0 else 0.0
+    print(f"[{label}] {rows} rows in {elapsed:.1f}s ({rate:,.0f} rows/s)")
+
+
+# Errors meaning LOAD DATA LOCAL is switched off on the server
+# (ER_NOT_ALLOWED_COMMAND, ER_CLIENT_LOCAL_FILES_DISABLED) or refused by
+# the client library (CR_LOAD_DATA_LOCAL_INFILE_REJECTED).
+LOCAL_INFILE_DISABLED_ERRNOS = (1148, 3948, 2068)
+
+LOAD_RAW_CSV_QUERY = """
+    LOAD DATA LOCAL INFILE %s INTO TABLE user_data
+    CHARACTER SET utf8mb4
+    FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '"' ESCAPED BY ''
+    LINES TERMINATED BY '\\n'
+    IGNORE 1 LINES
+    (name, email, @age)
+    SET user_id = UUID(), age = @age
+"""
+
+LOAD_TRANSFORMED_QUERY = """
+    LOAD DATA LOCAL INFILE %s INTO TABLE user_data
+    CHARACTER SET utf8mb4
+    FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\'
+    LINES TERMINATED BY '\\n'
+    (user_id, name, email, age)
+"""
+
+
+def _tsv_field(value):
+    """Escapes a value for LOAD DATA's default tab-separated format."""
+    return (str(value).replace('\\', '\\\\')
+            .replace('\t', '\\t').replace('\n', '\\n'))
+
+
+def write_load_file(data_file, out_file):
+    """
+    Pre-transforms the user CSV into a tab-separated file for LOAD DATA.
+
+    Rows go through read_user_rows, so ages are validated and user_ids are
+    generated exactly as in the INSERT path.
+
+    Returns:
+        int: The number of rows written.
+    """
+    written = 0
+    for row in read_user_rows(data_file):
+        out_file.write('\t'.join(_tsv_field(value) for value in row) + '\n')
+        written += 1
+    out_file.flush()
+    return written
+
+
+def bulk_load_data(data_file, server_uuid=True):
+    """
+    Loads the CSV file with LOAD DATA LOCAL INFILE on a dedicated connection.
+
+    Args:
+        data_file (str): Path to the CSV file.
+        server_uuid (bool): Load the raw CSV and let the server assign
+            user_id with UUID(). The whole load is then a single statement,
+            which fails as a unit on a malformed age. With False the CSV is
+            first rewritten to a temp file by write_load_file, which skips
+            bad rows like the INSERT path does.
+
+    Returns:
+        int: The number of rows loaded, or None if LOCAL INFILE is disabled,
+        the server is unreachable or the backend has no LOAD DATA (SQLite),
+        and the caller should fall back.
+    """
+    if not get_backend().supports_local_infile:
+        print(f"LOAD DATA is not available on the {get_backend().name} backend")
+        return None
+    connection = connect_to_prodev(allow_local_infile=True)
+    if not connection:
+        return None
+
+    cursor = connection.cursor()
+    load_path = os.path.abspath(data_file)
+    temp_path = None
+    started = time.monotonic()
+
+    try:
+        if server_uuid:
+            query = LOAD_RAW_CSV_QUERY
+        else:
+            query = LOAD_TRANSFORMED_QUERY
+            with tempfile.NamedTemporaryFile(
+                    mode='w', encoding='utf-8', newline='', suffix='.tsv',
+                    delete=False) as temp_file:
+                temp_path = temp_file.name
+                write_load_file(data_file, temp_file)
+            load_path = temp_path
+
+        cursor.execute(query, (load_path,))
+        connection.commit()
+        loaded = cursor.rowcount
+        _report_progress("bulk_load_data", loaded, started)
+        return loaded
+
+    except DatabaseError as err:
+        connection.rollback()
+        if err.errno in LOCAL_INFILE_DISABLED_ERRNOS:
+            print(f"LOAD DATA LOCAL INFILE is not allowed: {err}")
+            return None
+        raise
+
+    finally:
+        cursor.close()
+        connection.close()
+        if temp_path:
+            os.remove(temp_path)
+
+
+def shard_ranges(data_file, shards):
+    """
+    Splits a CSV file into byte ranges that start on record boundaries.
+
+    Args:
+        data_file (str): Path to the CSV file.
+        shards (int): Desired number of ranges.
+
+    Returns:
+        list: Non-empty (start, end) offset pairs covering the whole file.
+    """
+    size = os.path.getsize(data_file)
+    boundaries = [0]
+    with open(data_file, mode='rb') as file:
+        for i in range(1, shards):
+            file.seek(size * i // shards)
+            file.readline()  # Move to the start of the next full line
+            boundaries.append(max(file.tell(), boundaries[-1]))
+    boundaries.append(size)
+    return [(a, b) for a, b in zip(boundaries, boundaries[1:]) if a < b]
+
+
+def ingest_shard(data_file, start, end, chunk_size=INSERT_CHUNK_SIZE):
+    """
+    Inserts the records of one byte range on its own connection.
+
+    Runs inside a worker process. user_ids come from row_uuid and rows are
+    written with backend.bulk_insert, so re-running a shard after a
+    partial failure never creates duplicates.
+
+    Returns:
+        int: The number of records in the range.
+
+    Raises:
+        DatabaseError: On any database failure, so the caller can
+        retry the shard.
+    """
+    connection = connect_to_prodev()
+    if not connection:
+        raise DatabaseError(f"Could not connect to {DATABASE_NAME}")
+
+    cursor = connection.cursor()
+    records = (
+        (row_uuid(offset, name, email, age), name, email, age)
+        for offset, name, email, age in iter_user_records(data_file, start, end)
+    )
+    inserted = 0
+    try:
+        while True:
+            chunk = list(islice(records, chunk_size))
+            if not chunk:
+                break
+            connection.start_transaction()
+            get_backend().bulk_insert(cursor, chunk)
+            connection.commit()
+            inserted += len(chunk)
+        return inserted
+    except DatabaseError:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+        connection.close()
+
+
+def insert_data_parallel(data_file, workers=None, chunk_size=INSERT_CHUNK_SIZE,
+                         retries=INGEST_RETRIES):
+    """
+    Ingests the CSV file with a process pool, one byte-range shard per task.
+
+    Parsing and UUID generation are spread across `workers` processes, each
+    with its own connection. The file is cut into several shards per worker
+    so a slow shard does not leave the other workers idle. A shard that
+    fails is retried up to `retries` times; because ingest_shard is
+    idempotent, the retry simply re-inserts the whole range.
+
+    Returns:
+        int: The number of records ingested.
+    """
+    workers = workers or os.cpu_count() or 1
+    ranges = shard_ranges(data_file, workers * 4)
+    attempts = dict.fromkeys(ranges, 0)
+    total = 0
+    started = time.monotonic()
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = {
+            executor.submit(ingest_shard, data_file, start, end, chunk_size):
+                (start, end)
+            for start, end in ranges
+        }
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                shard = pending.pop(future)
+                try:
+                    total += future.result()
+                except DatabaseError as err:
+                    attempts[shard] += 1
+                    if attempts[shard] > retries:
+                        for other in pending:
+                            other.cancel()
+                        raise
+                    print(f"Retrying shard {shard} after error: {err}")
+                    retry = executor.submit(
+                        ingest_shard, data_file, shard[0], shard[1], chunk_size
+                    )
+                    pending[retry] = shard
+
+    _report_progress("insert_data_parallel", total, started)
+    return total
+
+
+def insert_data(connection, data_file, chunk_size=INSERT_CHUNK_SIZE,
+                mode="chunked", workers=None, checkpoint=True):
+    """
+    Streams the CSV file into user_data, only if the table is empty.
+
+    The file is read through iter_user_records and sent with executemany in
+    chunks of `chunk_size` rows, so memory use does not grow with the file.
+    Progress and throughput are printed every PROGRESS_INTERVAL seconds.
+
+    In "chunked" mode the byte offset and row count of the last committed
+    record are saved to a checkpoint file after every commit. A starting
+    checkpoint (offset 0) is written before the first chunk, so a load that
+    dies before any later checkpoint is still recognised as unfinished. If
+    the load is interrupted, the next call finds the checkpoint (even though
+    the table is no longer empty) and resumes right after that record. The
+    checkpoint is removed once the whole file is loaded.
+
+    Args:
+        connection: An open connection to ALX_prodev.
+        data_file (str): Path to the CSV file.
+        chunk_size (int): Rows per executemany call.
+        mode (str): "chunked" commits every chunk in its own transaction, so
+            a failure only rolls back the chunk in flight. "atomic" keeps the
+            original all-or-nothing behaviour: one transaction, committed
+            after the last chunk and rolled back entirely on any error.
+            "bulk" uses bulk_load_data (LOAD DATA LOCAL INFILE) and falls
+            back to "chunked" when the server or client disallows it.
+            "parallel" uses insert_data_parallel with `workers` processes.
+        workers (int): Process count for "parallel"; defaults to the CPU count.
+        checkpoint (bool or str): Checkpoint file for "chunked" mode; True
+            uses checkpoint_path(data_file) and False disables resuming.
+
+    Returns:
+        int: The number of rows committed by this call.
+    """
+    if mode not in ("chunked", "atomic", "bulk", "parallel"):
+        raise ValueError(f"Unknown insert mode {mode!r}")
+
+    if checkpoint is True:
+        checkpoint = checkpoint_path(data_file)
+    if mode != "chunked":
+        checkpoint = None
+
+    cursor = connection.cursor()
+    resume = None
+
     try:
         cursor.execute("SELECT COUNT(*) FROM user_data")
         count = cursor.fetchone()[0]
-        if count > 0:
+        if count > 0 and checkpoint and os.path.exists(data_file):
+            resume = load_checkpoint(checkpoint, data_file)
+        if count > 0 and not resume:
             print("Data already exists in user_data. Skipping insertion.")
             cursor.close()
-            return
-    except mysql.connector.Error as err:
+            return 0
+    except DatabaseError as err:
         print(f"Error checking data existence: {err}")
         cursor.close()
-        return
+        return 0
+
+    if mode == "parallel":
+        cursor.close()
+        try:
+            loaded = insert_data_parallel(data_file, workers, chunk_size)
+        except FileNotFoundError:
+            print(f"Error: The file {data_file} was not found.")
+            return 0
+        except DatabaseError as err:
+            print(f"Failed to insert data: {err}")
+            return 0
+        print(f"Successfully inserted {loaded} rows into user_data.")
+        return loaded
+
+    if mode == "bulk":
+        cursor.close()
+        try:
+            loaded = bulk_load_data(data_file)
+        except FileNotFoundError:
+            print(f"Error: The file {data_file} was not found.")
+            return 0
+        except DatabaseError as err:
+            print(f"Failed to bulk load data: {err}")
+            return 0
+        if loaded is not None:
+            print(f"Successfully inserted {loaded} rows into user_data.")
+            return loaded
+        print("Falling back to chunked INSERT.")
+        return insert_data(connection, data_file, chunk_size, mode="chunked")
+
+    if resume:
+        print(f"Resuming from checkpoint: {resume['rows']} rows already "
+              f"loaded, continuing after byte {resume['offset']}.")
+    after = resume['offset'] if resume else None
+    previously = resume['rows'] if resume else 0
+
+    committed = 0
+    sent = 0
+    started = last_report = time.monotonic()
+    records = _records_after(data_file, after)
 
     try:
-        with open(data_file, mode='r', encoding='utf-8') as file:
-            csv_reader = csv.reader(file)
-            next(csv_reader)  # Skip the header row (e.g., user_id,name,email,age)
-            
-            rows_to_insert = []
-            for row in csv_reader:
-                new_uuid = str(uuid.uuid4())
+        if checkpoint and not resume:
+            # Offset 0 replays the file from the start: nothing is
+            # committed yet, and re-inserted rows are no-ops.
+            save_checkpoint(checkpoint, data_file, 0, 0)
 
-                # The CSV row is already in the correct order: [user_id, name, email, age]
-                # We need to convert 'age' to an integer for the INT column
-                try:
-                    age = int(row[2]) # Convert age from string to int
-                    # rows_to_insert.append(tuple(row))
-                except ValueError as e:
-                    print(f"Skipping row due to invalid age: {row}. Error: {e}")
-                    continue
+        if mode == "atomic":
+            connection.start_transaction()
 
-                data_tuple = (new_uuid, row[0], row[1], age)
-                rows_to_insert.append(data_tuple)
-            
-            # Using executemany to insert all rows in one go for efficiency
-            if rows_to_insert:
-                cursor.executemany(insert_query, rows_to_insert)
+        while True:
+            chunk = list(islice(records, chunk_size))
+            if not chunk:
+                break
+
+            if mode == "chunked":
+                connection.start_transaction()
+            get_backend().bulk_insert(cursor, [
+                (row_uuid(offset, name, email, age), name, email, age)
+                for offset, name, email, age in chunk
+            ])
+            sent += len(chunk)
+            if mode == "chunked":
                 connection.commit()
-                print(f"Successfully inserted {cursor.rowcount} rows into user_data.")
+                committed = sent
+                if checkpoint:
+                    save_checkpoint(checkpoint, data_file, chunk[-1][0],
+                                    previously + committed)
+
+            now = time.monotonic()
+            if now - last_report >= PROGRESS_INTERVAL:
+                _report_progress("insert_data", sent, started)
+                last_report = now
+
+        if mode == "atomic":
+            connection.commit()
+            committed = sent
+
+        if checkpoint and os.path.exists(checkpoint):
+            os.remove(checkpoint)
+
+        _report_progress("insert_data", committed, started)
+        print(f"Successfully inserted {committed} rows into user_data.")
 
     except FileNotFoundError:
         print(f"Error: The file {data_file} was not found.")
-    except mysql.connector.Error as err:
+    except DatabaseError as err:
         print(f"Failed to insert data: {err}")
         connection.rollback()
+        print(f"{committed} rows were committed before the failure.")
     finally:
-        cursor.close()
\ No newline at end of file
+        records.close()
+        cursor.close()
+
+    return committed
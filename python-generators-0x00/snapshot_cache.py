@@ -0,0 +1,394 @@
+"""
+Local on-disk snapshot cache for user_data scans.
+
+A scan of user_data (for one column projection) is written to a local
+binary file in the columnar layout of rows.ColumnBatch. As long as the
+table has not changed, later scans stream straight out of that file through
+mmap: integer columns and string offsets/data are memoryview slices of the
+mapping, so no bytes are copied until a value is actually read.
+
+Snapshots are keyed by table, projection and a change marker (see
+change_marker). A scan that finds no snapshot for the current marker reads
+from the database and writes the snapshot on the way through. The cache keeps
+several projections, evicting the least recently used snapshot once the
+total size exceeds its cap.
+
+File layout:
+
+    b"PDSNAP01"
+    per batch, per column, 8-byte aligned:
+        int column:     int32 values
+        string column:  int32 offsets (rows + 1), then UTF-8 data
+    footer:             JSON describing names, kinds, buffer positions and
+                        the byte order of the int32 buffers
+    uint64              footer length, little-endian
+    b"PDSNAP01"
+
+The int32 buffers are written in the writer's native byte order, so they
+can be mapped without conversion. A host with the other byte order reads
+them through byte-swapped copies instead.
+"""
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import threading
+import time
+from array import array
+
+from predicates import compile_projection
+from rows import (INTEGER_COLUMNS, ROW_FORMATS, ColumnBatch, StringColumn,
+                  batch_converter)
+from seed import CHANGE_COLUMN, get_backend, has_column, pooled_connection
+
+stream_batches = __import__('1-batch_processing')
+
+SNAPSHOT_DIR = os.environ.get("PRODEV_SNAPSHOT_DIR", ".snapshots")
+SNAPSHOT_MAX_BYTES = 512 * 1024 * 1024
+SNAPSHOT_BATCH_SIZE = 10000
+
+_MAGIC = b"PDSNAP01"
+_TRAILER = struct.Struct("<Q")
+
+
+def change_marker(table="user_data"):
+    """
+    Returns a string that changes whenever the table's contents change.
+
+    It is the row count ("<count>:...") followed by MAX(updated_at) when
+    the table has that column (see seed.add_change_tracking), or by the
+    backend's change token otherwise: the table's UPDATE_TIME on MySQL
+    (CHECKSUM TABLE only while that is unusable, see
+    backends.MySQLBackend.change_token), the database file stamps on
+    SQLite. Either way a cache hit costs no more than a COUNT(*).
+    """
+    if table != "user_data":
+        raise ValueError(f"Unsupported table {table!r}")
+    with pooled_connection() as connection:
+        if not connection:
+            return None
+        cursor = connection.cursor()
+        try:
+            if has_column(connection, table, CHANGE_COLUMN):
+                cursor.execute(f"SELECT COUNT(*), MAX({CHANGE_COLUMN}) FROM {table}")
+                count, latest = cursor.fetchone()
+                return f"{count}:{latest}"
+            cursor.execute(f"SELECT COUNT(*) FROM {table}")
+            count = cursor.fetchone()[0]
+            return f"{count}:{get_backend().change_token(cursor, table)}"
+        finally:
+            cursor.close()
+
+
+def _marker_rows(marker):
+    return int(marker.split(":", 1)[0])
+
+
+class SnapshotWriter:
+    """
+    Writes ColumnBatches in the snapshot layout to any binary file object.
+
+    Buffer positions are counted here rather than taken from file.tell(),
+    so the target can also be a compressing stream (see export.py);
+    only uncompressed files can be read back with read_snapshot, though.
+    """
+
+    def __init__(self, file, names):
+        self.file = file
+        self.names = tuple(names)
+        self.kinds = ["int" if name in INTEGER_COLUMNS else "str"
+                      for name in self.names]
+        self.batches = []
+        self.position = 0
+        self._write(_MAGIC)
+
+    def _write(self, data):
+        self.file.write(data)
+        self.position += memoryview(data).nbytes
+
+    def _pad(self):
+        """Advances to the next 8-byte boundary."""
+        remainder = self.position % 8
+        if remainder:
+            self._write(b"\0" * (8 - remainder))
+
+    def write(self, batch):
+        columns = []
+        for name, kind in zip(self.names, self.kinds):
+            column = batch[name]
+            self._pad()
+            if kind == "int":
+                columns.append([self.position])
+                self._write(column)
+            else:
+                offsets_at = self.position
+                self._write(column.offsets)
+                data_at = self.position
+                self._write(column.data)
+                columns.append([offsets_at, data_at, len(column.data)])
+        self.batches.append({"rows": len(batch), "columns": columns})
+
+    def finish(self, marker=None):
+        """Writes the footer; the caller closes the file."""
+        footer = json.dumps({
+            "names": self.names,
+            "kinds": self.kinds,
+            "byteorder": sys.byteorder,
+            "marker": marker,
+            "batches": self.batches,
+        }).encode("utf-8")
+        self._write(footer)
+        self._write(_TRAILER.pack(len(footer)))
+        self._write(_MAGIC)
+
+
+def read_snapshot(path):
+    """
+    Generator that streams the ColumnBatches of a snapshot file via mmap.
+
+    The batches reference the mapping directly; it is released once the
+    generator and every batch it produced have been dropped. Files written
+    on a host of the other byte order are read through swapped copies.
+    """
+    with open(path, "rb") as file:
+        mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    view = memoryview(mapped)
+    if view[:8] != _MAGIC or view[-8:] != _MAGIC:
+        raise ValueError(f"{path} is not a snapshot file")
+    (footer_length,) = _TRAILER.unpack(view[-16:-8])
+    footer = json.loads(bytes(view[-16 - footer_length:-16]))
+    # Files from before the byte order was recorded were written on
+    # little-endian hosts.
+    swap = footer.get("byteorder", "little") != sys.byteorder
+
+    def int32s(start, count):
+        values = view[start:start + 4 * count]
+        if not swap:
+            return values.cast("i")
+        copy = array('i')
+        copy.frombytes(values)
+        copy.byteswap()
+        return copy
+
+    for entry in footer["batches"]:
+        rows = entry["rows"]
+        columns = []
+        for kind, position in zip(footer["kinds"], entry["columns"]):
+            if kind == "int":
+                start = position[0]
+                columns.append(int32s(start, rows))
+            else:
+                offsets_at, data_at, data_length = position
+                offsets = int32s(offsets_at, rows + 1)
+                columns.append(StringColumn(offsets, view[data_at:data_at + data_length]))
+        yield ColumnBatch(footer["names"], columns)
+
+
+class SnapshotCache:
+    """
+    An index of snapshot files with a total size cap and LRU eviction.
+
+    The index lives in <directory>/index.json and is rewritten atomically;
+    it is shared by processes using the same directory, but concurrent
+    writers in different processes are not coordinated.
+    """
+
+    def __init__(self, directory=SNAPSHOT_DIR, max_bytes=SNAPSHOT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    @property
+    def _index_path(self):
+        return os.path.join(self.directory, "index.json")
+
+    def _load(self):
+        try:
+            with open(self._index_path, encoding="utf-8") as file:
+                return json.load(file)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _save(self, index):
+        temp_path = f"{self._index_path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:
+            json.dump(index, file)
+        os.replace(temp_path, self._index_path)
+
+    @staticmethod
+    def key(table, columns, marker):
+        raw = json.dumps([table, list(columns), marker]).encode("utf-8")
+        return hashlib.sha1(raw).hexdigest()
+
+    def entries(self):
+        """Snapshot key -> metadata (table, columns, size, last access)."""
+        with self._lock:
+            return self._load()
+
+    def get(self, table, columns, marker):
+        """Path of the snapshot for this marker, or None. Marks it used."""
+        key = self.key(table, columns, marker)
+        with self._lock:
+            index = self._load()
+            entry = index.get(key)
+            if entry is None:
+                return None
+            path = os.path.join(self.directory, entry["file"])
+            if not os.path.exists(path):
+                del index[key]
+                self._save(index)
+                return None
+            entry["last_access"] = time.time()
+            self._save(index)
+            return path
+
+    def new_file(self):
+        """A fresh temp path inside the cache directory for a writer."""
+        handle, path = tempfile.mkstemp(suffix=".partial", dir=self.directory)
+        os.close(handle)
+        return path
+
+    def put(self, table, columns, marker, temp_path):
+        """
+        Registers a finished snapshot file and enforces the size cap.
+
+        Older snapshots of the same table and projection are dropped, since
+        their marker is out of date.
+        """
+        key = self.key(table, columns, marker)
+        file_name = f"{key}.snap"
+        os.replace(temp_path, os.path.join(self.directory, file_name))
+        with self._lock:
+            index = self._load()
+            for old_key, entry in list(index.items()):
+                if entry["table"] == table and entry["columns"] == list(columns):
+                    self._remove(index, old_key)
+            index[key] = {
+                "file": file_name,
+                "table": table,
+                "columns": list(columns),
+                "marker": marker,
+                "size": os.path.getsize(os.path.join(self.directory, file_name)),
+                "last_access": time.time(),
+            }
+            self._evict(index)
+            self._save(index)
+
+    def _remove(self, index, key):
+        entry = index.pop(key)
+        try:
+            os.remove(os.path.join(self.directory, entry["file"]))
+        except FileNotFoundError:
+            pass
+
+    def _evict(self, index):
+        total = sum(entry["size"] for entry in index.values())
+        for key in sorted(index, key=lambda k: index[k]["last_access"]):
+            if total <= self.max_bytes:
+                break
+            total -= index[key]["size"]
+            self._remove(index, key)
+
+    def invalidate(self, table=None, columns=None):
+        """
+        Drops cached snapshots.
+
+        Args:
+            table (str): Only snapshots of this table; all when None.
+            columns (iterable): Only this projection; all when None.
+        """
+        with self._lock:
+            index = self._load()
+            for key, entry in list(index.items()):
+                if table is not None and entry["table"] != table:
+                    continue
+                if columns is not None and entry["columns"] != list(columns):
+                    continue
+                self._remove(index, key)
+            self._save(index)
+
+
+_cache = None
+
+
+def get_cache():
+    """The process-wide SnapshotCache in SNAPSHOT_DIR."""
+    global _cache
+    if _cache is None:
+        _cache = SnapshotCache()
+    return _cache
+
+
+def cached_stream_users_in_batches(columns=None, row_format="columns",
+                                   batch_size=SNAPSHOT_BATCH_SIZE, cache=None,
+                                   refresh=False):
+    """
+    Generator over user_data batches, served from the snapshot cache.
+
+    On a hit the batches stream zero-copy from the mmap'd snapshot, in the
+    batch sizes they were written with. On a miss the table is scanned with
+    stream_users_in_batches and the snapshot is written as the batches are
+    yielded; it is only registered if the scan runs to completion.
+
+    Args:
+        columns (iterable): Projection; all columns when None.
+        row_format (str): "columns" (zero-copy ColumnBatch) or any other
+            rows.BATCH_FORMATS format, converted per batch.
+        batch_size (int): fetchmany size when the table has to be scanned.
+        cache (SnapshotCache): Defaults to get_cache().
+        refresh (bool): Ignore an existing snapshot and rescan.
+
+    Yields:
+        A batch in row_format.
+    """
+    cache = cache or get_cache()
+    names = compile_projection(columns)
+    convert = None
+    if row_format != "columns":
+        to_rows = batch_converter(row_format, names)
+        convert = lambda batch: to_rows(list(batch.rows()))
+
+    marker = change_marker()
+    path = None if refresh or marker is None else cache.get("user_data", names, marker)
+
+    if path is not None:
+        for batch in read_snapshot(path):
+            yield convert(batch) if convert else batch
+        return
+
+    temp_path = cache.new_file()
+    file = open(temp_path, "wb")
+    writer = SnapshotWriter(file, names)
+    written = 0
+    completed = False
+    try:
+        for batch in stream_batches.stream_users_in_batches(
+                batch_size, columns=names, row_format="columns"):
+            writer.write(batch)
+            written += len(batch)
+            yield convert(batch) if convert else batch
+        completed = True
+    finally:
+        # stream_users_in_batches reports query errors and just stops, so a
+        # scan is only trusted if it saw as many rows as the marker counted.
+        keep = completed and marker is not None and written == _marker_rows(marker)
+        if keep:
+            writer.finish(marker)
+        file.close()
+        if keep:
+            cache.put("user_data", names, marker, temp_path)
+        else:
+            os.remove(temp_path)
+
+
+def cached_stream_users(columns=None, row_format="dict", cache=None):
+    """Row-at-a-time view of cached_stream_users_in_batches."""
+    if row_format not in ROW_FORMATS:
+        raise ValueError(f"Unknown row format {row_format!r}; "
+                         f"expected one of {', '.join(ROW_FORMATS)}")
+    for batch in cached_stream_users_in_batches(columns, row_format, cache=cache):
+        yield from batch